@@ -8,6 +8,10 @@ import platform
 import sys
 from dotenv import load_dotenv
 from utils.database import Database
+from utils.economy_service import EconomyService
+from utils.animator import MessageAnimator
+from utils.metrics_server import MetricsServer
+from utils.scheduler import Scheduler
 
 # Force SelectorEventLoop on Windows (fixes aiodns issue)
 if platform.system() == 'Windows':
@@ -56,10 +60,15 @@ class ModuBot(commands.Bot):
             'cogs.guild_slash_commands',  # Guild-related slash commands
             'cogs.moderation_slash_commands',  # Moderation slash commands
             'cogs.economy_slash_commands',  # New economy system
+            'cogs.global_commands',  # Cross-server economy commands
             'utils.database_admin',  # Add database admin cog
             'utils.debug'  # Debug utilities with command sync tools
         ]
         self.db = Database()
+        self.economy = EconomyService(self.db)
+        self.animator = MessageAnimator()
+        self.metrics_server = MetricsServer(self.economy)
+        self.scheduler = Scheduler()
         self.synced = False
         self.launch_time = None
         
@@ -74,6 +83,19 @@ class ModuBot(commands.Bot):
         except Exception as e:
             self.logger.error(f"Error setting up database: {e}")
             self.logger.info("Continuing with limited database functionality...")
+        
+        # Load economy data once, before any economy cog uses it
+        try:
+            await self.economy.load()
+        except Exception as e:
+            self.logger.error(f"Error loading economy data: {e}")
+            self.logger.info("Economy commands will be unavailable until the bot restarts...")
+        self.economy.listen(self)
+        
+        try:
+            await self.metrics_server.start()
+        except Exception as e:
+            self.logger.error(f"Error starting metrics server: {e}")
             
         # Load extensions
         self.logger.info("Setting up bot extensions...")
@@ -85,6 +107,18 @@ class ModuBot(commands.Bot):
                 self.logger.error(f"Failed to load extension {extension}: {e}")
         
         self.logger.info("All extensions processed")
+        
+        # Re-arm timed actions saved before the last shutdown, now that cogs have registered their handlers
+        self.scheduler.start()
+
+    async def close(self):
+        # Unload cogs first so anything they flush on shutdown still has a database
+        await super().close()
+        await self.scheduler.close()
+        await self.animator.close()
+        await self.metrics_server.close()
+        await self.economy.close()
+        await self.db.close()
 
     async def on_ready(self):
         # Always sync slash commands
@@ -1,14 +1,13 @@
 import discord
 from discord.ext import commands
 from utils.embed_helper import EmbedHelper
-from utils.database import Database
 
 class CustomCommands(commands.Cog):
     """Create and manage custom commands for your server"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database()
+        self.db = bot.db
         self.cache = {}  # Format: {guild_id: {command_name: {"response": response, "id": id}}}
     
     async def cog_load(self):
@@ -169,7 +168,7 @@ class CustomCommands(commands.Cog):
         # Remove the command from the database
         try:
             command_id = existing_cmd.data[0]['id']
-            await self.db.supabase.table('custom_commands').delete().eq('id', command_id).execute()
+            await self.db.delete_custom_command(command_id)
             
             # Remove from cache
             if ctx.guild.id in self.cache and name.lower() in self.cache[ctx.guild.id]:
@@ -211,7 +210,7 @@ class CustomCommands(commands.Cog):
         # Update the command in the database
         try:
             command_id = existing_cmd.data[0]['id']
-            await self.db.supabase.table('custom_commands').update({'response': response}).eq('id', command_id).execute()
+            await self.db.update_custom_command(command_id, {'response': response})
             
             # Update cache
             if ctx.guild.id in self.cache and name.lower() in self.cache[ctx.guild.id]:
@@ -305,7 +304,7 @@ class CustomCommands(commands.Cog):
             fields=[
                 {"name": "Response", "value": f"```\n{response}\n```", "inline": False},
                 {"name": "Created By", "value": creator_name, "inline": True},
-                {"name": "Uses", "value": str(command['uses']), "inline": True},
+                {"name": "Uses", "value": str(command['uses'] + self.db.usage_counter.pending(command['id'])), "inline": True},
                 {"name": "Created At", "value": command['created_at'].split('T')[0] if 'T' in str(command['created_at']) else str(command['created_at']), "inline": True}
             ]
         )
@@ -3,8 +3,6 @@ from discord import app_commands
 from discord.ext import commands
 import random
 import asyncio
-import json
-import os
 import datetime
 from typing import Optional, Literal
 import time
@@ -12,18 +10,13 @@ import time
 from utils.slash_helper import SlashHelper
 from utils.embed_helper import EmbedHelper
 
-# File path to store economy data
-ECONOMY_FILE = 'data/economy.json'
-
-# Ensure data directory exists
-os.makedirs(os.path.dirname(ECONOMY_FILE), exist_ok=True)
-
 # Default settings
-DEFAULT_STARTING_BALANCE = 500
 DEFAULT_DAILY_AMOUNT = 200
 DEFAULT_CURRENCY_NAME = "coins"
 DEFAULT_CURRENCY_EMOJI = "🪙"  # Gold coin emoji
 
+TRANSACTIONS_PER_PAGE = 10
+
 # Coin flip images
 HEADS_IMAGE = "https://i.imgur.com/1mu0idy.png"  # Update with user's actual heads image
 TAILS_IMAGE = "https://i.imgur.com/JgGr5xz.png"  # Update with user's actual tails image
@@ -35,9 +28,8 @@ class Economy(commands.Cog):
         self.bot = bot
         self.currency_name = DEFAULT_CURRENCY_NAME
         self.currency_emoji = DEFAULT_CURRENCY_EMOJI
-        self.economy_data = {}
         self.cooldowns = {}
-        self.load_economy_data()
+        self.economy = bot.economy
         
         # Setup the economy command group
         self.economy_group = app_commands.Group(name="economy", description="Economy and currency commands")
@@ -46,53 +38,33 @@ class Economy(commands.Cog):
         # Add groups to the bot's command tree
         self.bot.tree.add_command(self.economy_group)
         self.bot.tree.add_command(self.gambling_group)
-        
-        # Shop items - Name, price, description, role_id (if applicable)
-        self.shop_items = [
-            {"id": "vip", "name": "VIP Status", "price": 5000, "description": "Exclusive VIP role in the server", "role_based": True, "role_id": None},
-            {"id": "colorchange", "name": "Custom Color", "price": 2000, "description": "Change your name color in the server", "role_based": False},
-            {"id": "lootbox", "name": "Mystery Lootbox", "price": 1000, "description": "Contains random amount of coins (500-2000)", "role_based": False}
-        ]
     
-    def load_economy_data(self):
-        """Load economy data from file"""
-        try:
-            if os.path.exists(ECONOMY_FILE):
-                with open(ECONOMY_FILE, 'r') as f:
-                    self.economy_data = json.load(f)
-                self.bot.logger.info("Economy data loaded successfully")
-            else:
-                self.economy_data = {"users": {}}
-                self.save_economy_data()
-                self.bot.logger.info("Created new economy data file")
-        except Exception as e:
-            self.bot.logger.error(f"Error loading economy data: {e}")
-            self.economy_data = {"users": {}}
+    def mark_dirty(self, *user_ids):
+        """Mark users' economy data as changed so it is re-ranked and saved by the background writer"""
+        self.economy.mark_dirty(*user_ids)
     
-    def save_economy_data(self):
-        """Save economy data to file"""
-        try:
-            with open(ECONOMY_FILE, 'w') as f:
-                json.dump(self.economy_data, f, indent=4)
-        except Exception as e:
-            self.bot.logger.error(f"Error saving economy data: {e}")
+    def format_transaction(self, transaction):
+        """Describe a transaction record in one line"""
+        kind = transaction.get("type")
+        if kind == "daily":
+            text = f"Daily reward: +{self.format_currency(transaction['amount'])}"
+        elif kind == "transfer_out":
+            text = f"Sent {self.format_currency(transaction['amount'])} to <@{transaction['to']}>"
+        elif kind == "transfer_in":
+            text = f"Received {self.format_currency(transaction['amount'])} from <@{transaction['from']}>"
+        elif kind == "purchase":
+            text = f"Bought {transaction['name']} for {self.format_currency(transaction['price'])}"
+        elif kind == "gambling":
+            change = transaction["amount_change"]
+            text = f"{transaction['game'].title()}: {'+' if change >= 0 else '-'}{self.format_currency(abs(change))}"
+        else:
+            text = str(kind)
+        
+        return f"<t:{int(transaction['timestamp'])}:R> {text}"
     
     def get_user_data(self, user_id):
         """Get a user's economy data, creating it if it doesn't exist"""
-        user_id = str(user_id)  # Convert to string for JSON serialization
-        
-        if user_id not in self.economy_data["users"]:
-            self.economy_data["users"][user_id] = {
-                "balance": DEFAULT_STARTING_BALANCE,
-                "last_daily": 0,
-                "inventory": [],
-                "total_earned": DEFAULT_STARTING_BALANCE,
-                "total_spent": 0,
-                "transactions": []
-            }
-            self.save_economy_data()
-            
-        return self.economy_data["users"][user_id]
+        return self.economy.get_user(user_id)
     
     def format_currency(self, amount):
         """Format currency amount with emoji and name"""
@@ -192,16 +164,17 @@ class Economy(commands.Cog):
         user_data["balance"] += amount
         user_data["last_daily"] = current_time
         user_data["total_earned"] += amount
+        self.economy.metrics.mint("daily", amount)
         
         # Add transaction record
-        user_data["transactions"].append({
+        self.economy.add_transaction(user_id, {
             "type": "daily",
             "amount": amount,
             "timestamp": current_time
         })
         
-        # Save data
-        self.save_economy_data()
+        # Queue the changes for saving
+        self.mark_dirty(user_id)
         
         # Create embed response
         embed = discord.Embed(
@@ -278,22 +251,22 @@ class Economy(commands.Cog):
         # Add transaction records
         current_time = time.time()
         
-        sender_data["transactions"].append({
+        self.economy.add_transaction(interaction.user.id, {
             "type": "transfer_out",
             "to": str(user.id),
             "amount": amount,
             "timestamp": current_time
         })
         
-        recipient_data["transactions"].append({
+        self.economy.add_transaction(user.id, {
             "type": "transfer_in",
             "from": str(interaction.user.id),
             "amount": amount,
             "timestamp": current_time
         })
         
-        # Save data
-        self.save_economy_data()
+        # Queue the changes for saving
+        self.mark_dirty(interaction.user.id, user.id)
         
         # Create embed response
         embed = discord.Embed(
@@ -344,26 +317,13 @@ class Economy(commands.Cog):
         """Display a leaderboard of the richest users in the server"""
         await interaction.response.defer(thinking=True)
         
-        # Get all users in the server and their balances
-        server_users = []
-        for user_id, data in self.economy_data["users"].items():
-            try:
-                # Check if user is in the server
-                member = interaction.guild.get_member(int(user_id))
-                if member:
-                    server_users.append((
-                        user_id,
-                        data["balance"],
-                        member.display_name
-                    ))
-            except:
-                continue
-        
-        # Sort by balance (highest first)
-        server_users.sort(key=lambda x: x[1], reverse=True)
-        
-        # Only show top 10
-        top_users = server_users[:10]
+        # Get the top 10 from this server's sorted balance index
+        leaderboard = self.economy.get_guild_leaderboard(interaction.guild)
+        top_users = []
+        for user_id, balance in leaderboard.top(10):
+            member = interaction.guild.get_member(int(user_id))
+            if member:
+                top_users.append((user_id, balance, member.display_name))
         
         if not top_users:
             await SlashHelper.error(
@@ -401,9 +361,8 @@ class Economy(commands.Cog):
         
         # Add user's rank if not in top 10
         if str(interaction.user.id) not in [user_id for user_id, _, _ in top_users]:
-            # Find user's position
-            user_rank = next((i for i, (user_id, _, _) in enumerate(server_users, 1) 
-                             if user_id == str(interaction.user.id)), None)
+            # Look up user's position
+            user_rank = leaderboard.rank(str(interaction.user.id))
             
             if user_rank:
                 user_data = self.get_user_data(interaction.user.id)
@@ -418,40 +377,62 @@ class Economy(commands.Cog):
         
         await interaction.followup.send(embed=embed)
     
-    @economy_group.command(name="shop", description="View items available in the shop")
-    async def economy_shop(self, interaction: discord.Interaction):
-        """Display the shop with items available for purchase"""
+    @economy_group.command(name="history", description="View your transaction history")
+    @app_commands.describe(page="The page of history to view (newest first)")
+    async def economy_history(self, interaction: discord.Interaction, page: Optional[int] = 1):
+        """View your transactions, including ones moved to the archive"""
+        page = max(1, page)
+        transactions, total_pages = await self.economy.get_transactions(interaction.user.id, page, TRANSACTIONS_PER_PAGE)
+        
+        if not transactions:
+            await SlashHelper.error(
+                interaction,
+                title="No Transactions",
+                description="You don't have any transactions on that page." if page > 1 else "You don't have any transactions yet.",
+                ephemeral=True
+            )
+            return
+        
+        embed = discord.Embed(
+            title=f"{interaction.user.display_name}'s Transactions",
+            description="\n".join(self.format_transaction(transaction) for transaction in transactions),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Page {page}/{total_pages}")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    def build_shop_embed(self):
+        """Build the item listing of /economy shop, which is rebuilt only when the catalog changes"""
         embed = discord.Embed(
             title="ModuBot Shop",
             description=f"Use `/economy buy <item_id>` to purchase an item",
             color=discord.Color.dark_purple()
         )
         
-        # Get user data for showing if they can afford items
-        user_data = self.get_user_data(interaction.user.id)
-        user_balance = user_data["balance"]
-        
         # List all shop items
-        for item in self.shop_items:
-            # Check if user can afford
-            affordable = "✅" if user_balance >= item["price"] else "❌"
-            
-            # Format price
-            price_str = f"{self.currency_emoji} **{item['price']:,}**"
-            
+        for item in self.economy.catalog.items():
             embed.add_field(
                 name=f"{item['name']} ({item['id']})",
-                value=f"{item['description']}\n**Price:** {price_str} {affordable}",
+                value=f"{item['description']}\n**Price:** {self.currency_emoji} **{item['price']:,}**",
                 inline=False
             )
         
+        embed.set_thumbnail(url="https://i.imgur.com/VDC6Fas.png")  # Shop icon
+        return embed
+    
+    @economy_group.command(name="shop", description="View items available in the shop")
+    async def economy_shop(self, interaction: discord.Interaction):
+        """Display the shop with items available for purchase"""
+        user_data = self.get_user_data(interaction.user.id)
+        
+        # Copy the prebuilt listing and add the parts that differ per user
+        embed = self.economy.catalog.view("prefix_shop", self.build_shop_embed).copy()
         embed.add_field(
             name="Your Balance",
-            value=self.format_currency(user_balance),
+            value=self.format_currency(user_data["balance"]),
             inline=False
         )
-            
-        embed.set_thumbnail(url="https://i.imgur.com/VDC6Fas.png")  # Shop icon
         embed.set_footer(text=f"Requested by {interaction.user.display_name}")
         
         await interaction.response.send_message(embed=embed)
@@ -461,7 +442,7 @@ class Economy(commands.Cog):
     async def economy_buy(self, interaction: discord.Interaction, item_id: str):
         """Purchase an item from the shop using your currency"""
         # Find the item
-        item = next((item for item in self.shop_items if item["id"].lower() == item_id.lower()), None)
+        item = self.economy.catalog.get(item_id)
         
         if not item:
             await SlashHelper.error(
@@ -486,26 +467,25 @@ class Economy(commands.Cog):
             return
         
         # Handle purchase based on item type
-        if item["id"] == "vip":
+        if item["type"] == "role":
             # Check if role exists and bot has permission
             vip_role = None
-            if item["role_id"]:
+            if item.get("role_id"):
                 vip_role = interaction.guild.get_role(item["role_id"])
             
             # If no role is set or role doesn't exist, try to find one by name
+            role_name = item.get("role_name", "VIP")
             if not vip_role:
-                vip_role = discord.utils.get(interaction.guild.roles, name="VIP")
+                vip_role = discord.utils.get(interaction.guild.roles, name=role_name)
             
             # If still no role, try to create one
             if not vip_role:
                 try:
                     vip_role = await interaction.guild.create_role(
-                        name="VIP",
+                        name=role_name,
                         color=discord.Color.gold(),
-                        reason="ModuBot Economy: VIP role purchase"
+                        reason=f"ModuBot Economy: {item['name']} purchase"
                     )
-                    item["role_id"] = vip_role.id
-                    self.save_economy_data()
                 except:
                     await SlashHelper.error(
                         interaction,
@@ -517,7 +497,7 @@ class Economy(commands.Cog):
             
             # Try to add role to user
             try:
-                await interaction.user.add_roles(vip_role, reason="ModuBot Economy: Purchased VIP status")
+                await interaction.user.add_roles(vip_role, reason=f"ModuBot Economy: Purchased {item['name']}")
             except:
                 await SlashHelper.error(
                     interaction,
@@ -527,17 +507,17 @@ class Economy(commands.Cog):
                 )
                 return
                 
-            purchase_description = f"You've purchased VIP status and received the {vip_role.mention} role!"
+            purchase_description = f"You've purchased {item['name']} and received the {vip_role.mention} role!"
             
         elif item["id"] == "colorchange":
             # Start a process to select a color
             purchase_description = "You've purchased a custom color! A color picker will open after this message."
             
         elif item["id"] == "lootbox":
-            # Random amount between 500-2000
-            reward = random.randint(500, 2000)
+            reward = random.randint(item.get("reward_min", item["price"] // 2), item.get("reward_max", item["price"] * 2))
             user_data["balance"] += reward  # Add the reward
             user_data["total_earned"] += reward
+            self.economy.metrics.mint("lootbox", reward)
             purchase_description = f"You've opened a Mystery Lootbox and found {self.format_currency(reward)}!"
             
         else:
@@ -546,17 +526,19 @@ class Economy(commands.Cog):
         # Deduct the cost
         user_data["balance"] -= item["price"]
         user_data["total_spent"] += item["price"]
+        self.economy.metrics.burn("shop", item["price"])
         
         # Add to inventory if it's an item to keep
         if item["id"] not in ["lootbox"]:  # Lootbox is used immediately
             user_data["inventory"].append({
-                "item_id": item["id"],
+                "id": item["id"],
                 "name": item["name"],
                 "purchased_at": time.time()
             })
+            self.economy.add_income_source(interaction.user.id, item["id"])
         
         # Add transaction record
-        user_data["transactions"].append({
+        self.economy.add_transaction(interaction.user.id, {
             "type": "purchase",
             "item_id": item["id"],
             "name": item["name"],
@@ -564,8 +546,8 @@ class Economy(commands.Cog):
             "timestamp": time.time()
         })
         
-        # Save data
-        self.save_economy_data()
+        # Queue the changes for saving
+        self.mark_dirty(interaction.user.id)
         
         # Send success message
         embed = discord.Embed(
@@ -719,6 +701,7 @@ class Economy(commands.Cog):
             winnings = amount  # Double the bet (return original bet + winnings)
             user_data["balance"] += winnings
             user_data["total_earned"] += winnings
+            self.economy.metrics.mint("coinflip", winnings)
             
             outcome_title = "You Won!"
             outcome_color = discord.Color.green()
@@ -726,13 +709,14 @@ class Economy(commands.Cog):
         else:
             user_data["balance"] -= amount
             user_data["total_spent"] += amount
+            self.economy.metrics.burn("coinflip", amount)
             
             outcome_title = "You Lost!"
             outcome_color = discord.Color.red()
             outcome_description = f"The coin landed on **{result.title()}**. You lost {self.format_currency(amount)}."
         
         # Add transaction record
-        user_data["transactions"].append({
+        self.economy.add_transaction(interaction.user.id, {
             "type": "gambling",
             "game": "coinflip",
             "bet": amount,
@@ -743,8 +727,8 @@ class Economy(commands.Cog):
             "timestamp": time.time()
         })
         
-        # Save data
-        self.save_economy_data()
+        # Queue the changes for saving
+        self.mark_dirty(interaction.user.id)
         
         # Create the embed
         embed = discord.Embed(
@@ -864,6 +848,10 @@ class Economy(commands.Cog):
         # Update balance
         net_change = winnings - amount
         user_data["balance"] += net_change
+        if net_change > 0:
+            self.economy.metrics.mint("slots", net_change)
+        else:
+            self.economy.metrics.burn("slots", -net_change)
         
         if net_change > 0:
             user_data["total_earned"] += winnings
@@ -882,7 +870,7 @@ class Economy(commands.Cog):
             description = f"You rolled [{rolls[0]} | {rolls[1]} | {rolls[2]}] and lost {self.format_currency(amount)}."
         
         # Add transaction record
-        user_data["transactions"].append({
+        self.economy.add_transaction(interaction.user.id, {
             "type": "gambling",
             "game": "slots",
             "bet": amount,
@@ -892,8 +880,8 @@ class Economy(commands.Cog):
             "timestamp": time.time()
         })
         
-        # Save data
-        self.save_economy_data()
+        # Queue the changes for saving
+        self.mark_dirty(interaction.user.id)
         
         # Create the embed
         embed = discord.Embed(
@@ -3,24 +3,24 @@ from discord import app_commands
 from discord.ext import commands
 import random
 import asyncio
-import json
 import os
 import datetime
 from typing import Optional, Literal
 import time
 
-# File path to store economy data
-ECONOMY_FILE = 'data/economy.json'
-
-# Ensure data directory exists
-os.makedirs(os.path.dirname(ECONOMY_FILE), exist_ok=True)
+from utils.slots import DEFAULT_MACHINE as SLOT_MACHINE, JACKPOT, MIXED_FRUITS, MIXED_SYMBOLS
 
 # Default settings
-DEFAULT_STARTING_BALANCE = 500
 DEFAULT_DAILY_AMOUNT = 200
 DEFAULT_CURRENCY_NAME = "coins"
 DEFAULT_CURRENCY_EMOJI = "🪙"  # Gold coin emoji
 
+TRANSACTIONS_PER_PAGE = 10
+
+# In fast mode gambling commands settle and return immediately and their animations are
+# played by the bot's shared animator; otherwise each command plays its own animation
+FAST_GAMBLING = os.getenv("ECONOMY_FAST_GAMBLING", "true").lower() in ("1", "true", "yes")
+
 # Coin flip images
 HEADS_IMAGE = "https://cdn.discordapp.com/attachments/1348088564499480658/1348141750677536879/george-washington-crossing-the-delaware-quarter-heads.png?ex=67ce6258&is=67cd10d8&hm=c0b6fecd0696ed2ef1c090e6be2e255225be085b2b33f77283423a9056061782&"
 TAILS_IMAGE = "https://cdn.discordapp.com/attachments/1348088564499480658/1348142003677822997/quarter-dollar-us-coin-isolated-on-white.png?ex=67ce6294&is=67cd1114&hm=5ebd750b956fadc22bb7a25638c152455b3727ae2fbcf7253977685cefc4df2e&"
@@ -28,122 +28,63 @@ TAILS_IMAGE = "https://cdn.discordapp.com/attachments/1348088564499480658/134814
 class EconomySlashCommands(commands.Cog):
     """Economy commands using slash commands"""
     
+    economy_group = app_commands.Group(name="economy", description="Economy and currency commands")
+    
     def __init__(self, bot):
         self.bot = bot
         self.currency_name = DEFAULT_CURRENCY_NAME
         self.currency_emoji = DEFAULT_CURRENCY_EMOJI
-        self.economy_data = {}
-        self.load_economy_data()
+        self.economy = bot.economy
         
         # Initialize command groups
-        self.economy_group = app_commands.Group(name="economy", description="Economy and currency commands")
         self.gambling_group = app_commands.Group(name="gamble", description="Gambling commands for economy")
         
         # Add groups to the command tree
-        bot.tree.add_command(self.economy_group)
         bot.tree.add_command(self.gambling_group)
-        
-        # Shop items - Name, price, description, role_id (if applicable)
-        self.shop_items = {
-            "role1": {
-                "name": "VIP Role",
-                "price": 5000,
-                "description": "A special VIP role that changes your color",
-                "type": "role",
-                "role_id": None  # Will be set per-server
-            },
-            "nickname": {
-                "name": "Nickname Change",
-                "price": 1000,
-                "description": "Change your nickname with a custom color",
-                "type": "consumable"
-            },
-            "lootbox": {
-                "name": "Mystery Lootbox",
-                "price": 2500,
-                "description": "A mystery box that contains a random amount of coins",
-                "type": "consumable"
-            },
-            "windmill": {
-                "name": "Windmill",
-                "price": 7500,
-                "description": "Generates 15 coins every hour passively",
-                "type": "passive_income",
-                "income_rate": 15,
-                "income_period": 3600,  # 1 hour in seconds
-                "image_url": "https://cdn.discordapp.com/attachments/1348088564499480658/1348464651057373204/windmill.png"
-            },
-            "farm": {
-                "name": "Small Farm",
-                "price": 15000,
-                "description": "Generates 40 coins every hour passively",
-                "type": "passive_income",
-                "income_rate": 40,
-                "income_period": 3600,  # 1 hour in seconds
-                "image_url": "https://cdn.discordapp.com/attachments/1348088564499480658/1348464650784800888/farm.png"
-            },
-            "mine": {
-                "name": "Gold Mine",
-                "price": 30000,
-                "description": "Generates 100 coins every hour passively",
-                "type": "passive_income",
-                "income_rate": 100,
-                "income_period": 3600,  # 1 hour in seconds
-                "image_url": "https://cdn.discordapp.com/attachments/1348088564499480658/1348464650487140382/mine.png"
-            },
-            "factory": {
-                "name": "Factory",
-                "price": 50000,
-                "description": "Generates 180 coins every hour passively",
-                "type": "passive_income",
-                "income_rate": 180,
-                "income_period": 3600,  # 1 hour in seconds
-                "image_url": "https://cdn.discordapp.com/attachments/1348088564499480658/1348464650214551632/factory.png"
-            }
-        }
     
-    def load_economy_data(self):
-        """Load economy data from file"""
-        try:
-            if os.path.exists(ECONOMY_FILE):
-                with open(ECONOMY_FILE, 'r') as f:
-                    self.economy_data = json.load(f)
-            else:
-                self.economy_data = {}
-                self.save_economy_data()
-        except Exception as e:
-            print(f"Error loading economy data: {e}")
-            self.economy_data = {}
-    
-    def save_economy_data(self):
-        """Save economy data to file"""
-        try:
-            with open(ECONOMY_FILE, 'w') as f:
-                json.dump(self.economy_data, f, indent=4)
-        except Exception as e:
-            print(f"Error saving economy data: {e}")
+    def mark_dirty(self, *user_ids):
+        """Mark users' economy data as changed so it is re-ranked and saved by the background writer"""
+        self.economy.mark_dirty(*user_ids)
     
     def get_user_data(self, user_id):
         """Get a user's economy data, creating it if it doesn't exist"""
-        # Convert to string for JSON compatibility
-        user_id = str(user_id)
-        
-        if user_id not in self.economy_data:
-            self.economy_data[user_id] = {
-                "balance": DEFAULT_STARTING_BALANCE,
-                "last_daily": 0,
-                "inventory": [],
-                "total_earned": DEFAULT_STARTING_BALANCE,
-                "total_spent": 0
-            }
-            self.save_economy_data()
-            
-        return self.economy_data[user_id]
+        return self.economy.get_user(user_id)
     
     def format_currency(self, amount):
         """Format a currency amount with the currency symbol"""
         return f"{self.currency_emoji} **{amount:,}** {self.currency_name}"
     
+    def format_transaction(self, transaction):
+        """Describe a transaction record in one line"""
+        kind = transaction.get("type")
+        if kind == "daily":
+            text = f"Daily reward: +{self.format_currency(transaction['amount'])}"
+        elif kind == "transfer_out":
+            text = f"Sent {self.format_currency(transaction['amount'])} to <@{transaction['to']}>"
+        elif kind == "transfer_in":
+            text = f"Received {self.format_currency(transaction['amount'])} from <@{transaction['from']}>"
+        elif kind == "purchase":
+            text = f"Bought {transaction['name']} for {self.format_currency(transaction['price'])}"
+        elif kind == "gambling":
+            change = transaction["amount_change"]
+            text = f"{transaction['game'].title()}: {'+' if change >= 0 else '-'}{self.format_currency(abs(change))}"
+        else:
+            text = str(kind)
+        
+        return f"<t:{int(transaction['timestamp'])}:R> {text}"
+    
+    async def animate(self, channel_id, message, frames):
+        """Play (seconds_after_start, edit_kwargs) frames on a message"""
+        if FAST_GAMBLING:
+            self.bot.animator.play(channel_id, message.id, message.edit, frames)
+            return
+        
+        elapsed = 0
+        for at, kwargs in frames:
+            await asyncio.sleep(at - elapsed)
+            elapsed = at
+            await message.edit(**kwargs)
+    
     @app_commands.command(name="balance")
     @app_commands.describe(user="The user to check balance for (defaults to yourself)")
     async def balance_command(self, interaction: discord.Interaction, user: Optional[discord.User] = None):
@@ -186,14 +127,11 @@ class EconomySlashCommands(commands.Cog):
         user_id = str(interaction.user.id)
         user_data = self.get_user_data(user_id)
         
-        # Check cooldown
-        last_daily = user_data["last_daily"]
-        current_time = time.time()
-        time_since_last = current_time - last_daily
-        cooldown = 86400  # 24 hours in seconds
+        # Award the daily amount if the cooldown has passed
+        reward = DEFAULT_DAILY_AMOUNT
+        remaining = self.economy.claim_daily(user_id, reward)
         
-        if last_daily > 0 and time_since_last < cooldown:
-            remaining = cooldown - time_since_last
+        if remaining:
             hours, remainder = divmod(int(remaining), 3600)
             minutes, seconds = divmod(remainder, 60)
             
@@ -206,18 +144,16 @@ class EconomySlashCommands(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
             
-        # Award the daily amount
-        reward = DEFAULT_DAILY_AMOUNT
+        # Add transaction record
+        self.economy.add_transaction(user_id, {
+            "type": "daily",
+            "amount": reward,
+            "timestamp": time.time()
+        })
         
         # Check for streak bonuses (TODO: Implement streak logic)
         streak = 1
         
-        # Update user data
-        user_data["balance"] += reward
-        user_data["last_daily"] = current_time
-        user_data["total_earned"] += reward
-        self.save_economy_data()
-        
         # Create embed
         embed = discord.Embed(
             title="Daily Reward Claimed!",
@@ -279,9 +215,10 @@ class EconomySlashCommands(commands.Cog):
             
         # Get user data
         giver_data = self.get_user_data(interaction.user.id)
+        receiver_data = self.get_user_data(user.id)
         
-        # Check if the giver has enough money
-        if giver_data["balance"] < amount:
+        # Transfer the money if the giver has enough
+        if not await self.economy.transfer(interaction.user.id, user.id, amount):
             embed = discord.Embed(
                 title="Insufficient Funds",
                 description=f"You don't have enough coins! You need {self.format_currency(amount)} but only have {self.format_currency(giver_data['balance'])}.",
@@ -290,16 +227,24 @@ class EconomySlashCommands(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
             
-        # Get receiver data
-        receiver_data = self.get_user_data(user.id)
-        
-        # Transfer the money
-        giver_data["balance"] -= amount
-        receiver_data["balance"] += amount
         receiver_data["total_earned"] += amount
         
-        # Save data
-        self.save_economy_data()
+        # Add transaction records
+        current_time = time.time()
+        
+        self.economy.add_transaction(interaction.user.id, {
+            "type": "transfer_out",
+            "to": str(user.id),
+            "amount": amount,
+            "timestamp": current_time
+        })
+        
+        self.economy.add_transaction(user.id, {
+            "type": "transfer_in",
+            "from": str(interaction.user.id),
+            "amount": amount,
+            "timestamp": current_time
+        })
         
         # Create embed
         embed = discord.Embed(
@@ -344,27 +289,17 @@ class EconomySlashCommands(commands.Cog):
             pass
     
     @app_commands.command(name="leaderboard")
-    async def leaderboard_command(self, interaction: discord.Interaction):
+    @app_commands.describe(category="Rank users by balance or by passive income rate")
+    async def leaderboard_command(self, interaction: discord.Interaction, category: Literal["balance", "income"] = "balance"):
         """View the richest users in the server"""
         await interaction.response.defer(thinking=True)
         
-        # Filter for users in the current guild
-        guild_members = interaction.guild.members
-        member_ids = [str(member.id) for member in guild_members]
-        
-        # Get economy data for users in this guild
-        user_balances = []
-        for user_id, data in self.economy_data.items():
-            if user_id in member_ids:
-                user = interaction.guild.get_member(int(user_id))
-                if user:
-                    user_balances.append((user, data["balance"]))
-        
-        # Sort by balance (highest to lowest)
-        user_balances.sort(key=lambda x: x[1], reverse=True)
-        
-        # Only show top 10
-        top_users = user_balances[:10]
+        # Get the top 10 from this guild's sorted balance or income rate index
+        top_users = []
+        for user_id, balance in self.economy.get_guild_leaderboard(interaction.guild, category).top(10):
+            user = interaction.guild.get_member(int(user_id))
+            if user:
+                top_users.append((user, balance))
         
         if not top_users:
             embed = discord.Embed(
@@ -378,7 +313,7 @@ class EconomySlashCommands(commands.Cog):
         # Create embed
         embed = discord.Embed(
             title=f"💰 Economy Leaderboard - {interaction.guild.name}",
-            description="The richest users in the server:",
+            description="The highest passive incomes in the server:" if category == "income" else "The richest users in the server:",
             color=discord.Color.gold()
         )
         
@@ -396,7 +331,7 @@ class EconomySlashCommands(commands.Cog):
                 
             embed.add_field(
                 name=f"{medal}{user.display_name}",
-                value=self.format_currency(balance),
+                value=f"{self.format_currency(int(balance))} per hour" if category == "income" else self.format_currency(balance),
                 inline=False
             )
         
@@ -405,28 +340,100 @@ class EconomySlashCommands(commands.Cog):
         
         await interaction.followup.send(embed=embed)
     
-    @app_commands.command(name="shop")
-    async def shop_command(self, interaction: discord.Interaction):
-        """View items available in the shop"""
-        user_data = self.get_user_data(interaction.user.id)
+    @economy_group.command(name="stats", description="View money supply and inflation statistics")
+    async def economy_stats(self, interaction: discord.Interaction):
+        """View coins in circulation and where today's coins came from and went"""
+        metrics = self.economy.metrics
+        today = metrics.day()
+        minted_today = sum(today["minted"].values())
+        burned_today = sum(today["burned"].values())
         
-        # Create embed
+        embed = discord.Embed(
+            title="📊 Economy Statistics",
+            color=discord.Color.gold()
+        )
+        
+        embed.add_field(name="Total Supply", value=self.format_currency(metrics.supply), inline=True)
+        embed.add_field(name="Held in This Server", value=self.format_currency(self.economy.get_guild_supply(interaction.guild)), inline=True)
+        embed.add_field(name="Users", value=f"{len(self.economy.users):,}", inline=True)
+        
+        embed.add_field(
+            name="Minted Today",
+            value="\n".join(f"{source}: {amount:,}" for source, amount in today["minted"].most_common()) or "Nothing yet",
+            inline=True
+        )
+        embed.add_field(
+            name="Burned Today",
+            value="\n".join(f"{source}: {amount:,}" for source, amount in today["burned"].most_common()) or "Nothing yet",
+            inline=True
+        )
+        embed.add_field(
+            name="Net Change Today",
+            value=f"{minted_today - burned_today:+,} {self.currency_name}",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="All Time",
+            value=f"Minted: {sum(metrics.minted.values()):,}\nBurned: {sum(metrics.burned.values()):,}",
+            inline=False
+        )
+        
+        embed.set_footer(text="Days are in UTC")
+        await interaction.response.send_message(embed=embed)
+    
+    @economy_group.command(name="history", description="View your transaction history")
+    @app_commands.describe(page="The page of history to view (newest first)")
+    async def economy_history(self, interaction: discord.Interaction, page: Optional[int] = 1):
+        """View your transactions, including ones moved to the archive"""
+        page = max(1, page)
+        transactions, total_pages = await self.economy.get_transactions(interaction.user.id, page, TRANSACTIONS_PER_PAGE)
+        
+        if not transactions:
+            embed = discord.Embed(
+                title="No Transactions",
+                description="You don't have any transactions on that page." if page > 1 else "You don't have any transactions yet.",
+                color=discord.Color.red()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title=f"{interaction.user.display_name}'s Transactions",
+            description="\n".join(self.format_transaction(transaction) for transaction in transactions),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Page {page}/{total_pages}")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    def build_shop_embed(self):
+        """Build the item listing of /shop, which is rebuilt only when the catalog changes"""
         embed = discord.Embed(
             title="🛒 Server Shop",
-            description=f"Your balance: {self.format_currency(user_data['balance'])}\nUse `/economy buy <item_id>` to purchase items.",
             color=discord.Color.blue()
         )
         
         # Add shop items
-        for item_id, item in self.shop_items.items():
+        for item in self.economy.catalog.items():
             embed.add_field(
                 name=f"{item['name']} - {self.format_currency(item['price'])}",
-                value=f"**ID:** `{item_id}`\n{item['description']}\n**Type:** {item['type'].capitalize()}",
+                value=f"**ID:** `{item['id']}`\n{item['description']}\n**Type:** {item['type'].replace('_', ' ').capitalize()}",
                 inline=False
             )
         
         embed.set_thumbnail(url="https://i.imgur.com/cQ4R4xC.png")  # Shop icon
         embed.set_footer(text="Shop prices are subject to change")
+        return embed
+    
+    @app_commands.command(name="shop")
+    async def shop_command(self, interaction: discord.Interaction):
+        """View items available in the shop"""
+        user_data = self.get_user_data(interaction.user.id)
+        
+        # Only the balance differs per user, so copy the prebuilt listing and add it
+        embed = self.economy.catalog.view("slash_shop", self.build_shop_embed).copy()
+        embed.description = f"Your balance: {self.format_currency(user_data['balance'])}\nUse `/economy buy <item_id>` to purchase items."
         
         await interaction.response.send_message(embed=embed)
     
@@ -434,8 +441,16 @@ class EconomySlashCommands(commands.Cog):
     @app_commands.describe(item_id="The ID of the item to buy")
     async def buy_command(self, interaction: discord.Interaction, item_id: str):
         """Buy an item from the shop"""
+        # Granting a role awaits between the balance check and the charge, so hold the
+        # buyer's lock for the whole purchase
+        async with self.economy.user_locks.hold(interaction.user.id):
+            await self.process_purchase(interaction, item_id)
+    
+    async def process_purchase(self, interaction: discord.Interaction, item_id: str):
+        """Check, charge and deliver a shop purchase. Call with the buyer's lock held."""
         # Check if item exists
-        if item_id not in self.shop_items:
+        item = self.economy.catalog.get(item_id)
+        if item is None:
             embed = discord.Embed(
                 title="Error",
                 description=f"Item with ID `{item_id}` does not exist in the shop. Use `/economy shop` to see available items.",
@@ -444,9 +459,9 @@ class EconomySlashCommands(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
             
-        # Get user data and item info
+        # Get user data and the item's canonical ID
         user_data = self.get_user_data(interaction.user.id)
-        item = self.shop_items[item_id]
+        item_id = item["id"]
         
         # Check if user has enough money
         if user_data["balance"] < item["price"]:
@@ -462,9 +477,10 @@ class EconomySlashCommands(commands.Cog):
         if item["type"] == "role":
             # Handle role purchase
             role_id = item.get("role_id")
+            role_name = item.get("role_name")
             
             # Check if role is configured for this server
-            if not role_id:
+            if not role_id and not role_name:
                 embed = discord.Embed(
                     title="Role Not Configured",
                     description=f"The role for {item['name']} has not been configured for this server yet.",
@@ -473,8 +489,8 @@ class EconomySlashCommands(commands.Cog):
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
                 
-            # Get the role
-            role = interaction.guild.get_role(role_id)
+            # Get the role, by ID if the catalog has one and otherwise by name
+            role = interaction.guild.get_role(role_id) if role_id else discord.utils.get(interaction.guild.roles, name=role_name)
             if not role:
                 embed = discord.Embed(
                     title="Role Not Found",
@@ -507,13 +523,14 @@ class EconomySlashCommands(commands.Cog):
         elif item["type"] == "consumable":
             if item_id == "lootbox":
                 # Process lootbox
-                min_reward = item["price"] // 2
-                max_reward = item["price"] * 2
+                min_reward = item.get("reward_min", item["price"] // 2)
+                max_reward = item.get("reward_max", item["price"] * 2)
                 reward = random.randint(min_reward, max_reward)
                 
                 # Add reward to user's balance
                 user_data["balance"] += reward
                 user_data["total_earned"] += reward
+                self.economy.metrics.mint("lootbox", reward)
                 
                 # Create special lootbox embed
                 lootbox_embed = discord.Embed(
@@ -544,13 +561,24 @@ class EconomySlashCommands(commands.Cog):
                 "name": item["name"],
                 "purchased_at": time.time()
             })
+            self.economy.add_income_source(interaction.user.id, item_id)
         
         # Deduct the price
         user_data["balance"] -= item["price"]
         user_data["total_spent"] += item["price"]
+        self.economy.metrics.burn("shop", item["price"])
         
-        # Save data
-        self.save_economy_data()
+        # Add transaction record
+        self.economy.add_transaction(interaction.user.id, {
+            "type": "purchase",
+            "item_id": item_id,
+            "name": item["name"],
+            "price": item["price"],
+            "timestamp": time.time()
+        })
+        
+        # Queue the changes for saving
+        self.mark_dirty(interaction.user.id)
         
         # Send purchase confirmation
         embed = discord.Embed(
@@ -595,8 +623,8 @@ class EconomySlashCommands(commands.Cog):
         # Get user data
         user_data = self.get_user_data(interaction.user.id)
         
-        # Check if user has enough money
-        if user_data["balance"] < amount:
+        # Take the bet now, before the animation awaits
+        if not await self.economy.place_bet(interaction.user.id, amount):
             embed = discord.Embed(
                 title="Insufficient Funds",
                 description=f"You need {self.format_currency(amount)} to place this bet, but you only have {self.format_currency(user_data['balance'])}.",
@@ -616,10 +644,7 @@ class EconomySlashCommands(commands.Cog):
         )
         
         embed.set_image(url="https://i.imgur.com/7RJLnZY.gif")  # Coin flip GIF
-        await interaction.followup.send(embed=embed)
-        
-        # Wait for animation
-        await asyncio.sleep(2)
+        message = await interaction.followup.send(embed=embed)
         
         # Determine the result
         result = random.choice(["heads", "tails"])
@@ -628,18 +653,29 @@ class EconomySlashCommands(commands.Cog):
         # Update user balance
         if won:
             winnings = amount
-            user_data["balance"] += winnings
+            self.economy.credit(interaction.user.id, amount + winnings)  # Return the bet with the winnings
             user_data["total_earned"] += winnings
+            self.economy.metrics.mint("coinflip", winnings)
             result_text = f"You won {self.format_currency(winnings)}!"
             color = discord.Color.green()
         else:
-            user_data["balance"] -= amount
             user_data["total_spent"] += amount
+            self.economy.metrics.burn("coinflip", amount)
+            self.mark_dirty(interaction.user.id)
             result_text = f"You lost {self.format_currency(amount)}!"
             color = discord.Color.red()
-            
-        # Save data
-        self.save_economy_data()
+        
+        # Add transaction record
+        self.economy.add_transaction(interaction.user.id, {
+            "type": "gambling",
+            "game": "coinflip",
+            "bet": amount,
+            "choice": choice,
+            "result": result,
+            "outcome": "win" if won else "loss",
+            "amount_change": winnings if won else -amount,
+            "timestamp": time.time()
+        })
         
         # Update the embed with result
         result_embed = discord.Embed(
@@ -659,8 +695,9 @@ class EconomySlashCommands(commands.Cog):
             result_embed.set_image(url=HEADS_IMAGE)
         else:
             result_embed.set_image(url=TAILS_IMAGE)
-            
-        await interaction.edit_original_response(embed=result_embed)
+        
+        # Reveal the result once the coin flip GIF has played
+        await self.animate(interaction.channel_id, message, [(2, {"embed": result_embed})])
 
     @app_commands.command(name="slots")
     @app_commands.describe(amount="The amount to bet")
@@ -679,8 +716,8 @@ class EconomySlashCommands(commands.Cog):
         # Get user data
         user_data = self.get_user_data(interaction.user.id)
         
-        # Check if user has enough money
-        if user_data["balance"] < amount:
+        # Take the bet now, before the animation awaits
+        if not await self.economy.place_bet(interaction.user.id, amount):
             embed = discord.Embed(
                 title="Insufficient Funds",
                 description=f"You need {self.format_currency(amount)} to play slots, but you only have {self.format_currency(user_data['balance'])}.",
@@ -692,25 +729,6 @@ class EconomySlashCommands(commands.Cog):
         # Defer response
         await interaction.response.defer(thinking=True)
         
-        # Define slot machine symbols and their payouts
-        symbols = ["🍒", "🍊", "🍋", "🍇", "🍉", "💎", "7️⃣"]
-        weights = [20, 15, 15, 10, 10, 5, 2]  # Higher weight = more common
-        payouts = {
-            "🍒": 1.5,  # Three cherries pays 1.5x
-            "🍊": 2,    # Three oranges pays 2x
-            "🍋": 2,    # Three lemons pays 2x
-            "🍇": 2.5,  # Three grapes pays 2.5x
-            "🍉": 3,    # Three watermelons pays 3x
-            "💎": 5,    # Three diamonds pays 5x
-            "7️⃣": 10   # Three sevens pays 10x
-        }
-        
-        # Special combination payouts
-        special_combos = {
-            "mixed_fruits": 1,  # Any 3 fruits pays 1x
-            "mixed_symbols": 0.5  # Any 3 different symbols pays 0.5x
-        }
-        
         # Show initial slot machine
         slots_embed = discord.Embed(
             title="🎰 Slot Machine",
@@ -726,13 +744,11 @@ class EconomySlashCommands(commands.Cog):
         
         message = await interaction.followup.send(embed=slots_embed)
         
-        # Simulate spinning animation
-        await asyncio.sleep(1)
-        
         # Generate results with weighted randomness
-        results = random.choices(symbols, weights=weights, k=3)
+        results = SLOT_MACHINE.spin()
         
-        # Wait a bit between each reveal for suspense
+        # Reveal one reel at a time for suspense, after a second of spinning
+        frames = []
         for i in range(3):
             revealed = results[:i+1] + ["❓"] * (2-i)
             spins_text = " | ".join(revealed)
@@ -744,46 +760,43 @@ class EconomySlashCommands(commands.Cog):
                 inline=False
             )
             
-            await message.edit(embed=slots_embed)
-            await asyncio.sleep(0.7)
+            frames.append((1 + 0.7 * i, {"embed": slots_embed.copy()}))
         
         # Determine winnings
-        winnings = 0
+        kind, multiplier = SLOT_MACHINE.evaluate(results)
+        winnings = SLOT_MACHINE.winnings(amount, multiplier)
         
-        # Check for matching symbols
-        if results[0] == results[1] == results[2]:
-            # All three symbols match
-            multiplier = payouts[results[0]]
-            winnings = amount * multiplier
+        if kind == JACKPOT:
             result_text = f"**JACKPOT!** Three {results[0]} symbols! {multiplier}x payout!"
-        elif all(s in ["🍒", "🍊", "🍋", "🍇", "🍉"] for s in results):
-            # All fruits combo
-            winnings = amount * special_combos["mixed_fruits"]
-            result_text = f"All fruits! {special_combos['mixed_fruits']}x payout!"
-        elif results[0] != results[1] and results[1] != results[2] and results[0] != results[2]:
-            # All different symbols
-            winnings = amount * special_combos["mixed_symbols"]
-            result_text = f"All different symbols! {special_combos['mixed_symbols']}x payout!"
+        elif kind == MIXED_FRUITS:
+            result_text = f"All fruits! {multiplier}x payout!"
+        elif kind == MIXED_SYMBOLS:
+            result_text = f"All different symbols! {multiplier}x payout!"
         else:
-            # No win
-            winnings = 0
             result_text = "No matching symbols. Better luck next time!"
-            
-        # Round winnings to nearest integer
-        winnings = int(winnings)
         
         # Update user balance
         if winnings > 0:
-            user_data["balance"] += winnings
+            self.economy.credit(interaction.user.id, amount + winnings)  # Return the bet with the winnings
             user_data["total_earned"] += winnings
+            self.economy.metrics.mint("slots", winnings)
             color = discord.Color.green()
         else:
-            user_data["balance"] -= amount
             user_data["total_spent"] += amount
+            self.economy.metrics.burn("slots", amount)
+            self.mark_dirty(interaction.user.id)
             color = discord.Color.red()
-            
-        # Save data
-        self.save_economy_data()
+        
+        # Add transaction record
+        self.economy.add_transaction(interaction.user.id, {
+            "type": "gambling",
+            "game": "slots",
+            "bet": amount,
+            "result": results,
+            "outcome": "win" if winnings > 0 else "loss",
+            "amount_change": winnings if winnings > 0 else -amount,
+            "timestamp": time.time()
+        })
         
         # Update the embed with final result
         slots_embed = discord.Embed(
@@ -820,48 +833,12 @@ class EconomySlashCommands(commands.Cog):
         # Set thumbnail to slot machine image
         slots_embed.set_thumbnail(url="https://i.imgur.com/Nqpw7GK.png")  # Slot machine icon
         
-        await message.edit(embed=slots_embed)
+        frames.append((3.1, {"embed": slots_embed}))
+        await self.animate(interaction.channel_id, message, frames)
 
     async def calculate_passive_income(self, user_id):
         """Calculate passive income for a user based on their owned income-generating items"""
-        user_data = self.get_user_data(user_id)
-        if "inventory" not in user_data or not user_data["inventory"]:
-            return 0
-            
-        # Get current time
-        current_time = time.time()
-        total_income = 0
-        last_collected = user_data.get("last_income_collection", 0)
-        
-        # Calculate time since last collection
-        time_elapsed = current_time - last_collected
-        
-        # Process each inventory item
-        for item in user_data["inventory"]:
-            item_id = item.get("id")
-            purchase_time = item.get("purchased_at", 0)
-            
-            # Skip non-passive income items
-            if item_id not in self.shop_items:
-                continue
-                
-            shop_item = self.shop_items[item_id]
-            if shop_item.get("type") != "passive_income":
-                continue
-                
-            # Calculate income based on time elapsed
-            income_rate = shop_item.get("income_rate", 0)
-            income_period = shop_item.get("income_period", 3600)  # Default to hourly
-            
-            # Calculate periods elapsed (e.g., how many hours) since last collection
-            periods_elapsed = time_elapsed / income_period
-            
-            # Calculate income for this item
-            item_income = int(income_rate * periods_elapsed)
-            total_income += item_income
-            
-        # Return the calculated total income
-        return int(total_income)
+        return int(self.economy.accrued_income(self.get_user_data(user_id)))
         
     @app_commands.command(name="collect")
     async def collect_command(self, interaction: discord.Interaction):
@@ -869,16 +846,17 @@ class EconomySlashCommands(commands.Cog):
         user_id = str(interaction.user.id)
         user_data = self.get_user_data(user_id)
         
-        # Calculate income
-        income = await self.calculate_passive_income(user_id)
+        # Pay out whatever has accrued
+        income = self.economy.collect_income(user_id)
+        
+        # Owned passive income items, from the cached counts rather than the inventory
+        sources = [
+            (self.economy.catalog.get(item_id), count)
+            for item_id, count in user_data.get("income_sources", {}).items()
+            if item_id in self.economy.catalog
+        ]
         
-        # Update user data
         if income > 0:
-            user_data["balance"] += income
-            user_data["total_earned"] += income
-            user_data["last_income_collection"] = time.time()
-            self.save_economy_data()
-            
             # Create embed
             embed = discord.Embed(
                 title="💰 Income Collected!",
@@ -893,11 +871,10 @@ class EconomySlashCommands(commands.Cog):
             )
             
             # List active income sources
-            active_sources = []
-            for item in user_data["inventory"]:
-                if item["id"] in self.shop_items and self.shop_items[item["id"]]["type"] == "passive_income":
-                    source = self.shop_items[item["id"]]
-                    active_sources.append(f"• {source['name']}: {self.format_currency(source['income_rate'])} per hour")
+            active_sources = [
+                f"• {source['name']}{f' x{count}' if count > 1 else ''}: {self.format_currency(source['income_rate'] * count)} per hour"
+                for source, count in sources
+            ]
             
             if active_sources:
                 embed.add_field(
@@ -910,8 +887,7 @@ class EconomySlashCommands(commands.Cog):
             await interaction.response.send_message(embed=embed)
         else:
             # No income or no passive income sources
-            if not any(item["id"] in self.shop_items and self.shop_items[item["id"]]["type"] == "passive_income" 
-                      for item in user_data.get("inventory", [])):
+            if not sources:
                 embed = discord.Embed(
                     title="No Income Sources",
                     description="You don't have any passive income sources yet. Visit the shop to purchase windmills, farms, or other income-generating items!",
@@ -925,18 +901,9 @@ class EconomySlashCommands(commands.Cog):
                     color=discord.Color.gold()
                 )
                 
-                # Calculate time until next significant income
-                best_item = None
-                best_rate = 0
-                for item in user_data["inventory"]:
-                    if item["id"] in self.shop_items and self.shop_items[item["id"]]["type"] == "passive_income":
-                        rate = self.shop_items[item["id"]]["income_rate"]
-                        if rate > best_rate:
-                            best_rate = rate
-                            best_item = self.shop_items[item["id"]]
-                
-                if best_item:
-                    embed.set_footer(text=f"Your {best_item['name']} generates {self.format_currency(best_item['income_rate'])} per hour")
+                # Point out the best income source the user owns
+                best_item = max((source for source, _ in sources), key=lambda source: source["income_rate"])
+                embed.set_footer(text=f"Your {best_item['name']} generates {self.format_currency(best_item['income_rate'])} per hour")
                 
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -6,14 +6,13 @@ import json
 import requests
 from datetime import datetime
 from utils.embed_helper import EmbedHelper
-from utils.database import Database
 
 class Entertainment(commands.Cog):
     """Entertainment commands for fun and engagement"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database()
+        self.db = bot.db
         self.trivia_categories = None
         self.trivia_sessions = {}
         self.hangman_games = {}
@@ -2,30 +2,77 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import datetime
-import random
-from typing import Optional, List
+import time
+from typing import Optional
+
+from utils.levels import level_progress
+
+# Daily reward for /global daily. It shares its cooldown with /economy daily, so it pays the same.
+GLOBAL_DAILY_AMOUNT = 200
 
 class GlobalCommands(commands.Cog):
     """Global commands that work across all servers"""
     
+    # Define the global command group
+    global_group = app_commands.Group(name="global", description="Global commands that work across all servers")
+    
     def __init__(self, bot):
         self.bot = bot
-        # Define and register a global command group
-        self.global_group = app_commands.Group(name="global", description="Global commands that work across all servers")
-        bot.tree.add_command(self.global_group)
+        self.economy = bot.economy
+        self.economy.xp.on_level_up(self.announce_level_ups)
+    
+    async def cog_unload(self):
+        self.economy.xp.remove_level_up_listener(self.announce_level_ups)
+    
+    def get_shop_items(self):
+        """Get the passive income items sold in the global shop, cheapest first"""
+        return self.economy.catalog.of_type("passive_income")
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or message.guild is None:
+            return
+        
+        # Only a cooldown check and a dict update; the XP is applied in batches
+        self.economy.xp.award_message(message.author.id, message.channel.id)
+    
+    async def announce_level_ups(self, level_ups):
+        """Congratulate users in the channel where they earned the XP that levelled them up"""
+        for user_id, (level, channel_id) in level_ups.items():
+            channel = self.bot.get_channel(channel_id) if channel_id else None
+            if channel is None:
+                continue
+            try:
+                await channel.send(f"🎉 <@{user_id}> reached **level {level}**!")
+            except discord.HTTPException:
+                pass  # No permission to talk there, or the channel is gone
+    
+    def get_display_name(self, user_id):
+        user = self.bot.get_user(int(user_id))
+        return user.display_name if user else f"User {user_id}"
     
     @global_group.command(name="profile")
     @app_commands.describe(
         user="The user to show profile for (defaults to yourself)"
     )
     async def profile_command(
-        self, 
+        self,
         interaction: discord.Interaction,
         user: Optional[discord.Member] = None
     ):
         """View your or another user's global profile"""
         # Default to the interaction user if no user is specified
         target_user = user or interaction.user
+        user_id = str(target_user.id)
+        
+        # Look the user up without creating a record for them
+        user_data = self.economy.users.get(user_id)
+        if user_data is None:
+            await interaction.response.send_message(
+                f"{target_user.display_name} hasn't used the economy yet.",
+                ephemeral=True
+            )
+            return
         
         # Create an embed with the user's profile
         embed = discord.Embed(
@@ -36,20 +83,22 @@ class GlobalCommands(commands.Cog):
         
         embed.set_thumbnail(url=target_user.display_avatar.url)
         
-        # Mock profile data (in a real bot, this would come from a database)
-        embed.add_field(name="Global Rank", value="Level 5", inline=True)
-        embed.add_field(name="Global XP", value="1,250 XP", inline=True)
-        embed.add_field(name="Global Balance", value="5,280 🪙", inline=True)
+        balance_board = self.economy.get_global_leaderboard("balance")
+        rank = balance_board.rank(user_id)
+        embed.add_field(name="Global Rank", value=f"#{rank:,} of {len(balance_board):,}", inline=True)
+        level, level_xp, level_needed = level_progress(self.economy.xp.get_xp(user_id))
+        embed.add_field(name="Level", value=f"Level {level} ({level_xp:,}/{level_needed:,} XP)", inline=True)
+        embed.add_field(name="Global Balance", value=f"{user_data['balance']:,} 🪙", inline=True)
         
         # Passive income stats
-        embed.add_field(name="Income Rate", value="155 🪙/hour", inline=True)
-        embed.add_field(name="Inventory Items", value="8 items", inline=True)
-        embed.add_field(name="Achievements", value="2/10 unlocked", inline=True)
+        embed.add_field(name="Income Rate", value=f"{user_data.get('income_rate', 0):,.0f} 🪙/hour", inline=True)
+        embed.add_field(name="Inventory Items", value=f"{len(user_data['inventory'])} items", inline=True)
+        embed.add_field(name="Uncollected Income", value=f"{int(self.economy.accrued_income(user_data)):,} 🪙", inline=True)
         
         # Add join date
         embed.add_field(
-            name="Discord Member Since", 
-            value=f"<t:{int(target_user.created_at.timestamp())}:R>", 
+            name="Discord Member Since",
+            value=f"<t:{int(target_user.created_at.timestamp())}:R>",
             inline=False
         )
         
@@ -61,19 +110,29 @@ class GlobalCommands(commands.Cog):
     @global_group.command(name="collect")
     async def collect_command(self, interaction: discord.Interaction):
         """Collect income from all your passive income sources"""
-        # Mock collection (in a real bot, this would interact with a database)
-        amount = random.randint(100, 600)
-        hours = random.randint(1, 8)
+        user_id = str(interaction.user.id)
+        user_data = self.economy.get_user(user_id)
+        since = user_data.get("last_income_collection")
+        
+        income = self.economy.collect_income(user_id)
+        if income <= 0:
+            await interaction.response.send_message(
+                "You don't have any income to collect yet. Buy passive income items with `/global buy`.",
+                ephemeral=True
+            )
+            return
         
         embed = discord.Embed(
             title="Income Collected!",
-            description=f"You collected **{amount} 🪙** from your passive income sources!",
+            description=f"You collected **{income:,} 🪙** from your passive income sources!",
             color=discord.Color.green(),
             timestamp=datetime.datetime.now()
         )
         
-        embed.add_field(name="Time Accumulated", value=f"{hours} hours", inline=True)
-        embed.add_field(name="Next Collection", value="Available now", inline=True)
+        hours = (time.time() - since) / 3600 if since else 0
+        embed.add_field(name="Time Accumulated", value=f"{hours:.1f} hours", inline=True)
+        embed.add_field(name="Income Rate", value=f"{user_data.get('income_rate', 0):,.0f} 🪙/hour", inline=True)
+        embed.add_field(name="New Balance", value=f"{user_data['balance']:,} 🪙", inline=True)
         
         # Add a footer with a tip
         embed.set_footer(text="Tip: Buy more passive income items to increase your hourly rate")
@@ -90,24 +149,14 @@ class GlobalCommands(commands.Cog):
         app_commands.Choice(name="XP Level", value="xp"),
     ])
     async def leaderboard_command(
-        self, 
+        self,
         interaction: discord.Interaction,
         category: str = "balance"
     ):
         """View the global leaderboard"""
-        # Create a mock leaderboard (in a real bot, this would come from a database)
-        mock_users = [
-            {"name": "User1", "value": 10500, "rank": 1},
-            {"name": "User2", "value": 8200, "rank": 2},
-            {"name": "User3", "value": 7800, "rank": 3},
-            {"name": "User4", "value": 6500, "rank": 4},
-            {"name": "You", "value": 5280, "rank": 5},
-            {"name": "User6", "value": 4900, "rank": 6},
-            {"name": "User7", "value": 3700, "rank": 7},
-            {"name": "User8", "value": 2500, "rank": 8},
-            {"name": "User9", "value": 1800, "rank": 9},
-            {"name": "User10", "value": 1200, "rank": 10},
-        ]
+        # Read straight from the sorted index: O(log n + 10) however many users there are
+        board = self.economy.get_global_leaderboard(category)
+        user_id = str(interaction.user.id)
         
         title_map = {
             "balance": "Global Balance Leaderboard",
@@ -127,137 +176,154 @@ class GlobalCommands(commands.Cog):
             timestamp=datetime.datetime.now()
         )
         
+        entries = [(rank, entry_id, value) for rank, (entry_id, value) in enumerate(board.top(10), 1)]
+        if not entries:
+            embed.description = "Nobody is on this leaderboard yet!"
+            await interaction.response.send_message(embed=embed)
+            return
+        
+        # Show the caller's own position below the top 10
+        own_rank = board.rank(user_id)
+        if own_rank is not None and own_rank > 10:
+            entries.append((own_rank, user_id, board.score(user_id)))
+        
         # Format leaderboard entries
         leaderboard_text = ""
-        for user in mock_users:
-            marker = "► " if user["name"] == "You" else ""
-            rank_emoji = ["🥇", "🥈", "🥉"]
-            rank_display = rank_emoji[user["rank"]-1] if user["rank"] <= 3 else f"`#{user['rank']}`"
+        rank_emoji = ["🥇", "🥈", "🥉"]
+        for rank, entry_id, value in entries:
+            rank_display = rank_emoji[rank-1] if rank <= 3 else f"`#{rank}`"
+            line = f"{rank_display} {self.get_display_name(entry_id)}: {value:,.0f} {suffix_map.get(category, '')}"
             
-            if user["name"] == "You":
-                leaderboard_text += f"**{marker}{rank_display} {user['name']}: {user['value']:,} {suffix_map.get(category, '')}**\n"
+            if entry_id == user_id:
+                leaderboard_text += f"**► {line}**\n"
             else:
-                leaderboard_text += f"{marker}{rank_display} {user['name']}: {user['value']:,} {suffix_map.get(category, '')}\n"
+                leaderboard_text += f"{line}\n"
         
         embed.description = leaderboard_text
         
         # Add a footer
-        embed.set_footer(text="Updated every 30 minutes")
+        embed.set_footer(text=f"{len(board):,} users ranked")
         
         await interaction.response.send_message(embed=embed)
     
-    @global_group.command(name="shop")
-    async def shop_command(self, interaction: discord.Interaction):
-        """View the global shop for passive income items"""
+    def build_shop_embed(self):
+        """Build the global shop listing, which is rebuilt only when the catalog changes"""
         embed = discord.Embed(
             title="Global Shop",
             description="Purchase passive income items that work across all servers!",
-            color=discord.Color.blue(),
-            timestamp=datetime.datetime.now()
+            color=discord.Color.blue()
         )
         
         # Passive income items
-        embed.add_field(
-            name="🌀 Windmill - 7,500 🪙", 
-            value="Generates 15 coins per hour",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🌾 Small Farm - 15,000 🪙", 
-            value="Generates 40 coins per hour",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="⛏️ Gold Mine - 30,000 🪙", 
-            value="Generates 100 coins per hour",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🏭 Factory - 50,000 🪙", 
-            value="Generates 180 coins per hour",
-            inline=False
-        )
+        for item in self.get_shop_items():
+            embed.add_field(
+                name=f"{item['name']} - {item['price']:,} 🪙",
+                value=item["description"],
+                inline=False
+            )
         
         # Add a footer with instructions
         embed.set_footer(text="Use /global buy [item] to purchase these items")
-        
-        await interaction.response.send_message(embed=embed)
+        return embed
+    
+    @global_group.command(name="shop")
+    async def shop_command(self, interaction: discord.Interaction):
+        """View the global shop for passive income items"""
+        await interaction.response.send_message(embed=self.economy.catalog.view("global_shop", self.build_shop_embed))
     
     @global_group.command(name="buy")
     @app_commands.describe(
         item="The item to purchase"
     )
-    @app_commands.choices(item=[
-        app_commands.Choice(name="Windmill", value="windmill"),
-        app_commands.Choice(name="Small Farm", value="farm"),
-        app_commands.Choice(name="Gold Mine", value="mine"),
-        app_commands.Choice(name="Factory", value="factory"),
-    ])
     async def buy_command(
-        self, 
+        self,
         interaction: discord.Interaction,
         item: str
     ):
         """Purchase an item from the global shop"""
-        # Item details (in a real bot, this would be in a database or config)
-        items = {
-            "windmill": {"name": "Windmill", "price": 7500, "income": 15, "emoji": "🌀"},
-            "farm": {"name": "Small Farm", "price": 15000, "income": 40, "emoji": "🌾"},
-            "mine": {"name": "Gold Mine", "price": 30000, "income": 100, "emoji": "⛏️"},
-            "factory": {"name": "Factory", "price": 50000, "income": 180, "emoji": "🏭"},
-        }
+        selected_item = self.economy.catalog.get(item)
         
-        if item not in items:
+        if selected_item is None or selected_item["type"] != "passive_income":
             await interaction.response.send_message("Invalid item. Use /global shop to see available items.", ephemeral=True)
             return
         
-        selected_item = items[item]
-        
-        # Mock purchase (in a real bot, this would check the user's balance and update the database)
-        # For demo purposes, we'll simulate a successful purchase
+        item = selected_item["id"]
+        user_id = str(interaction.user.id)
         
+        async with self.economy.user_locks.hold(user_id):
+            if not self.economy.try_debit(user_id, selected_item["price"]):
+                await interaction.response.send_message(
+                    f"You need **{selected_item['price']:,} 🪙** to buy a {selected_item['name']}.",
+                    ephemeral=True
+                )
+                return
+            
+            user_data = self.economy.get_user(user_id)
+            user_data["inventory"].append({
+                "id": item,
+                "name": selected_item["name"],
+                "purchased_at": time.time()
+            })
+            user_data["total_spent"] += selected_item["price"]
+            self.economy.add_income_source(user_id, item)
+            self.economy.metrics.burn("shop", selected_item["price"])
+            self.economy.mark_dirty(user_id)
+        
+        income = self.economy.catalog.income_rate(item)
         embed = discord.Embed(
             title="Item Purchased!",
-            description=f"You purchased a {selected_item['emoji']} **{selected_item['name']}** for **{selected_item['price']:,} 🪙**",
+            description=f"You purchased a **{selected_item['name']}** for **{selected_item['price']:,} 🪙**",
             color=discord.Color.green(),
             timestamp=datetime.datetime.now()
         )
         
-        embed.add_field(name="Income Rate", value=f"+{selected_item['income']} 🪙/hour", inline=True)
-        embed.add_field(name="ROI Time", value=f"~{selected_item['price'] // selected_item['income']} hours", inline=True)
+        embed.add_field(name="Income Rate", value=f"+{income:,.0f} 🪙/hour", inline=True)
+        # The catalog may have been reloaded since the purchase, dropping the item
+        if income > 0:
+            embed.add_field(name="ROI Time", value=f"~{selected_item['price'] / income:,.0f} hours", inline=True)
         
         # Add a footer with a tip
         embed.set_footer(text="View your items with /global profile")
         
         await interaction.response.send_message(embed=embed)
     
+    @buy_command.autocomplete("item")
+    async def buy_item_autocomplete(self, interaction: discord.Interaction, current: str):
+        # Offered from the catalog, so items added by a reload show up without a restart
+        current = current.lower()
+        return [
+            app_commands.Choice(name=item["name"], value=item["id"])
+            for item in self.get_shop_items()
+            if current in item["name"].lower() or current in item["id"]
+        ][:25]
+    
     @global_group.command(name="daily")
     async def daily_command(self, interaction: discord.Interaction):
         """Claim your daily reward"""
-        # Mock daily reward (in a real bot, this would check if the user has already claimed today)
-        amount = random.randint(200, 500)
-        streak = random.randint(1, 10)
+        user_id = str(interaction.user.id)
+        remaining = self.economy.claim_daily(user_id, GLOBAL_DAILY_AMOUNT)
+        
+        if remaining:
+            await interaction.response.send_message(
+                f"You already claimed your daily reward. Come back <t:{int(time.time() + remaining)}:R>.",
+                ephemeral=True
+            )
+            return
         
         embed = discord.Embed(
             title="Daily Reward Claimed!",
-            description=f"You received **{amount} 🪙** as your daily reward!",
+            description=f"You received **{GLOBAL_DAILY_AMOUNT} 🪙** as your daily reward!",
             color=discord.Color.green(),
             timestamp=datetime.datetime.now()
         )
         
-        embed.add_field(name="Current Streak", value=f"{streak} days", inline=True)
+        embed.add_field(name="New Balance", value=f"{self.economy.get_user(user_id)['balance']:,} 🪙", inline=True)
         embed.add_field(name="Next Reward", value="24 hours", inline=True)
         
-        if streak % 7 == 0:
-            embed.add_field(name="Streak Bonus", value=f"+{100 * (streak // 7)} 🪙", inline=False)
-        
         # Add a footer with a tip
         embed.set_footer(text="Come back tomorrow for another reward!")
         
         await interaction.response.send_message(embed=embed)
 
 async def setup(bot):
-    await bot.add_cog(GlobalCommands(bot)) 
\ No newline at end of file
+    await bot.add_cog(GlobalCommands(bot))
\ No newline at end of file
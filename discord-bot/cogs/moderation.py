@@ -1,78 +1,119 @@
 import discord
 from discord.ext import commands
 import asyncio
-from datetime import datetime, timedelta
 from utils.embed_helper import EmbedHelper
-from utils.database import Database
+from utils.spam_detector import SpamDetector, DEFAULT_SPAM_THRESHOLD, DEFAULT_SPAM_TIMEFRAME
+from utils.duplicate_detector import DuplicateDetector
+from utils.link_matcher import GuildLinkMatchers
+from utils.raid_detector import (
+    RaidDetector, RAID_ACCOUNT_AGE, RAID_MODE_DURATION,
+    RAID_BAN_BATCH_SIZE, RAID_BAN_INTERVAL, RAID_DELETE_MESSAGE_SECONDS
+)
 
 class Moderation(commands.Cog):
     """Moderation commands for server management"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database()
-        self.spam_check = {}  # Format: {user_id: [message_count, first_message_time]}
-        self.spam_threshold = 5  # Number of messages
-        self.spam_timeframe = 5  # Seconds
+        self.db = bot.db
+        self.scheduler = bot.scheduler
+        self.spam_detector = SpamDetector()  # Per (guild, user) sliding windows; thresholds come from guild settings
+        self.duplicate_detector = DuplicateDetector()  # Near-copies of one message across accounts, per channel
+        self.link_matchers = GuildLinkMatchers()  # Banned links compiled per guild, rebuilt when the settings change
+        self.raid_detector = RaidDetector()
+        self.raid_tasks = {}  # Format: {guild_id: task banning that guild's raid suspects}
+        
+        # Timed unmutes and unbans are persisted by the bot's scheduler and run by these handlers
+        self.scheduler.register("unmute", self.scheduled_unmute)
+        self.scheduler.register("unban", self.scheduled_unban)
+    
+    async def cog_unload(self):
+        for task in self.raid_tasks.values():
+            task.cancel()
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        if member.bot:
+            return
+        
+        guild_settings = await self.db.get_guild_settings(member.guild.id)
+        if not guild_settings.get('raid_protection_enabled', False):
+            return
+        
+        if self.raid_detector.member_joined(member.guild.id, member.id, self.is_fresh_account(member)):
+            self.start_raid_response(member.guild)
     
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or not isinstance(message.channel, discord.TextChannel):
             return
         
+        # Guild settings are cached, so this is a dictionary lookup for most messages
+        guild_settings = await self.db.get_guild_settings(message.guild.id)
+        
+        # Watch new accounts for the same message posted from many of them
+        if guild_settings.get('raid_protection_enabled', False) and self.is_fresh_account(message.author):
+            if self.raid_detector.message_sent(message.guild.id, message.author.id, message.content):
+                self.start_raid_response(message.guild)
+        
         # Check for spam
-        await self.check_spam(message)
+        await self.check_spam(message, guild_settings)
         
         # Check for banned links/words (configurable from the database)
-        guild_settings = await self.db.get_guild_settings(message.guild.id)
         if guild_settings.get('moderation_enabled', True):
             # Auto-delete banned links if configured
             if guild_settings.get('banned_links_enabled', False):
-                banned_links = guild_settings.get('banned_links', [])
-                if any(link in message.content for link in banned_links):
+                matcher = self.link_matchers.get(message.guild.id, guild_settings.get('banned_links') or [])
+                if matcher.find(message.content):
                     try:
                         await message.delete()
-                        embed = EmbedHelper.warning_embed(
-                            title="Message Deleted",
-                            description=f"{message.author.mention}, your message was deleted because it contained a banned link."
-                        )
-                        await message.channel.send(embed=embed, delete_after=5)
+                        # Per-user warnings are held back during a raid
+                        if not self.raid_detector.in_raid(message.guild.id):
+                            embed = EmbedHelper.warning_embed(
+                                title="Message Deleted",
+                                description=f"{message.author.mention}, your message was deleted because it contained a banned link."
+                            )
+                            await message.channel.send(embed=embed, delete_after=5)
                     except discord.Forbidden:
                         pass
     
-    async def check_spam(self, message):
-        user_id = message.author.id
-        current_time = datetime.utcnow()
+    async def check_spam(self, message, guild_settings):
+        # A threshold of one message would flag every message
+        threshold = max(2, int(guild_settings.get('spam_threshold') or DEFAULT_SPAM_THRESHOLD))
+        timeframe = float(guild_settings.get('spam_timeframe') or DEFAULT_SPAM_TIMEFRAME)
         
-        if user_id in self.spam_check:
-            # Update existing entry
-            message_count, first_message_time = self.spam_check[user_id]
-            
-            # Check if we're still in the timeframe
-            if (current_time - first_message_time).total_seconds() <= self.spam_timeframe:
-                self.spam_check[user_id] = [message_count + 1, first_message_time]
-                
-                # Check if user has exceeded threshold
-                if message_count + 1 >= self.spam_threshold:
-                    # Apply spam action (mute or warn)
-                    await self.handle_spam(message)
-                    # Reset counter
-                    self.spam_check.pop(user_id, None)
-            else:
-                # Outside timeframe, reset counter
-                self.spam_check[user_id] = [1, current_time]
-        else:
-            # First message from this user
-            self.spam_check[user_id] = [1, current_time]
+        if self.spam_detector.hit(message.guild.id, message.author.id, threshold, timeframe):
+            # Apply spam action (mute or warn)
+            await self.handle_spam(message)
+        elif (
+            guild_settings.get('duplicate_detection_enabled', False)
+            and self.is_fresh_account(message.author)
+            and self.duplicate_detector.hit(message.channel.id, message.author.id, message.content)
+        ):
+            # The same message from many new accounts is spam even if none of them posts quickly.
+            # Only new accounts are tracked, so members all wishing each other a happy new year aren't.
+            try:
+                await message.delete()
+            except (discord.Forbidden, discord.NotFound):
+                pass
+            await self.handle_spam(
+                message,
+                "Automated duplicate message detection",
+                "please don't post the same message as other members."
+            )
     
-    async def handle_spam(self, message):
+    async def handle_spam(self, message, reason="Automated spam detection", warning="please slow down! You're sending messages too quickly."):
+        # During a raid, new members spamming are banned with the other raiders instead of warned one by one
+        if self.is_fresh_member(message.author) and self.raid_detector.add_suspect(message.guild.id, message.author.id):
+            return
+        
         guild_settings = await self.db.get_guild_settings(message.guild.id)
         mute_duration = guild_settings.get('spam_mute_duration', 5)  # minutes
         
         # Send warning
         embed = EmbedHelper.warning_embed(
             title="Spam Detected",
-            description=f"{message.author.mention}, please slow down! You're sending messages too quickly."
+            description=f"{message.author.mention}, {warning}"
         )
         await message.channel.send(embed=embed)
         
@@ -82,7 +123,7 @@ class Moderation(commands.Cog):
             "spam_warning", 
             message.author.id, 
             self.bot.user.id,
-            "Automated spam detection"
+            reason
         )
         
         # Temp mute if configured
@@ -105,16 +146,140 @@ class Moderation(commands.Cog):
                             "temp_mute", 
                             message.author.id, 
                             self.bot.user.id,
-                            "Automated spam detection",
+                            reason,
                             f"{mute_duration} minutes"
                         )
                         
                         # Schedule unmute
-                        await asyncio.sleep(mute_duration * 60)
-                        await message.author.remove_roles(mute_role)
+                        await self.scheduler.schedule(
+                            "unmute",
+                            message.guild.id,
+                            message.author.id,
+                            mute_duration * 60,
+                            {"role_id": mute_role.id}
+                        )
                 except discord.Forbidden:
                     pass
     
+    def is_fresh_account(self, user):
+        """Whether an account was created recently, as raid accounts usually are"""
+        return (discord.utils.utcnow() - user.created_at).total_seconds() < RAID_ACCOUNT_AGE
+    
+    def is_fresh_member(self, member):
+        """Whether a member has a fresh account or joined the server recently"""
+        if self.is_fresh_account(member):
+            return True
+        joined_at = getattr(member, 'joined_at', None)
+        return joined_at is not None and (discord.utils.utcnow() - joined_at).total_seconds() < RAID_MODE_DURATION
+    
+    def start_raid_response(self, guild):
+        task = self.raid_tasks.get(guild.id)
+        if task is None or task.done():
+            self.raid_tasks[guild.id] = asyncio.create_task(self.raid_response(guild))
+    
+    async def raid_response(self, guild):
+        """Ban raid suspects in bulk for as long as a guild is in raid mode, then log the raid once"""
+        started_at = discord.utils.utcnow()
+        await self.send_log_embed(guild, EmbedHelper.warning_embed(
+            title="Raid Detected",
+            description="Raid mode is on: new accounts taking part in the raid are banned in bulk and per-user warnings are paused."
+        ))
+        
+        banned, failed = 0, 0
+        while True:
+            # Checked before taking the suspects, so any collected just before the raid ends are still banned
+            raiding = self.raid_detector.in_raid(guild.id)
+            suspects = self.raid_detector.take_suspects(guild.id)
+            for start in range(0, len(suspects), RAID_BAN_BATCH_SIZE):
+                batch = [discord.Object(id=user_id) for user_id in suspects[start:start + RAID_BAN_BATCH_SIZE]]
+                try:
+                    result = await guild.bulk_ban(
+                        batch,
+                        reason="Automated raid protection",
+                        delete_message_seconds=RAID_DELETE_MESSAGE_SECONDS
+                    )
+                    banned += len(result.banned)
+                    failed += len(result.failed)
+                except discord.HTTPException:
+                    failed += len(batch)
+            
+            if not raiding:
+                break
+            await asyncio.sleep(RAID_BAN_INTERVAL)
+        
+        minutes = max(1, round((discord.utils.utcnow() - started_at).total_seconds() / 60))
+        
+        # One log entry for the whole raid rather than one per banned account
+        await self.db.add_moderation_log(
+            guild.id,
+            "raid_ban",
+            guild.id,
+            self.bot.user.id,
+            f"Automated raid protection: {banned} accounts banned" + (f", {failed} could not be banned" if failed else ""),
+            f"{minutes} minutes"
+        )
+        
+        await self.send_log_embed(guild, EmbedHelper.success_embed(
+            title="Raid Over",
+            description="Raid mode has ended and per-user warnings are back on.",
+            fields=[
+                {"name": "Banned", "value": str(banned), "inline": True},
+                {"name": "Failed", "value": str(failed), "inline": True},
+                {"name": "Duration", "value": f"{minutes} minutes", "inline": True}
+            ]
+        ))
+    
+    async def send_log_embed(self, guild, embed):
+        guild_settings = await self.db.get_guild_settings(guild.id)
+        log_channel_id = guild_settings.get('log_channel_id')
+        log_channel = guild.get_channel(int(log_channel_id)) if log_channel_id else None
+        if log_channel is not None:
+            try:
+                await log_channel.send(embed=embed)
+            except discord.Forbidden:
+                pass
+    
+    async def scheduled_unmute(self, guild_id, user_id, data):
+        """Lift a temporary mute when it runs out"""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(int(guild_id))
+        member = guild.get_member(int(user_id)) if guild else None
+        if member is None:
+            return  # The bot or the member left the server
+        
+        mute_role = guild.get_role(int(data["role_id"]))
+        if mute_role is None or mute_role not in member.roles:
+            return
+        
+        await member.remove_roles(mute_role, reason="Temporary mute expired")
+        channel = guild.get_channel(int(data["channel_id"])) if data.get("channel_id") else None
+        if channel is not None:
+            embed = EmbedHelper.info_embed(
+                title="User Unmuted",
+                description=f"{member.mention} has been automatically unmuted after {data['duration']} minutes."
+            )
+            await channel.send(embed=embed)
+    
+    async def scheduled_unban(self, guild_id, user_id, data):
+        """Lift a temporary ban when it runs out"""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(int(guild_id))
+        if guild is None:
+            return
+        
+        try:
+            await guild.unban(discord.Object(id=int(user_id)), reason="Temporary ban expired")
+        except discord.NotFound:
+            return  # Already unbanned
+        
+        await self.db.add_moderation_log(
+            guild.id,
+            "unban",
+            int(user_id),
+            self.bot.user.id,
+            "Temporary ban expired"
+        )
+    
     @commands.command()
     @commands.has_permissions(kick_members=True)
     async def kick(self, ctx, member: discord.Member, *, reason="No reason provided"):
@@ -185,6 +350,50 @@ class Moderation(commands.Cog):
             )
             await ctx.send(embed=embed)
     
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def tempban(self, ctx, member: discord.Member, duration: int, *, reason="No reason provided"):
+        """Ban a member for a number of minutes"""
+        if member.top_role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
+            embed = EmbedHelper.error_embed(
+                title="Permission Error", 
+                description="You cannot ban someone with a higher or equal role to yours."
+            )
+            return await ctx.send(embed=embed)
+        
+        if duration <= 0:
+            embed = EmbedHelper.error_embed(
+                title="Invalid Duration",
+                description="The ban duration must be at least 1 minute. Use `ban` for a permanent ban."
+            )
+            return await ctx.send(embed=embed)
+        
+        try:
+            await member.ban(reason=reason)
+            await self.scheduler.schedule("unban", ctx.guild.id, member.id, duration * 60)
+            embed = EmbedHelper.success_embed(
+                title="User Banned",
+                description=f"{member.mention} has been banned from the server for {duration} minutes.",
+                fields=[{"name": "Reason", "value": reason}]
+            )
+            await ctx.send(embed=embed)
+            
+            # Log the action
+            await self.db.add_moderation_log(
+                ctx.guild.id, 
+                "temp_ban", 
+                member.id, 
+                ctx.author.id,
+                reason,
+                f"{duration} minutes"
+            )
+        except discord.Forbidden:
+            embed = EmbedHelper.error_embed(
+                title="Permission Error",
+                description="I don't have permission to ban that member."
+            )
+            await ctx.send(embed=embed)
+    
     @commands.command()
     @commands.has_permissions(ban_members=True)
     async def unban(self, ctx, user_id: int, *, reason="No reason provided"):
@@ -201,6 +410,7 @@ class Moderation(commands.Cog):
                 return await ctx.send(embed=embed)
             
             await ctx.guild.unban(user, reason=reason)
+            await self.scheduler.cancel("unban", ctx.guild.id, user.id)
             embed = EmbedHelper.success_embed(
                 title="User Unbanned",
                 description=f"{user.mention} has been unbanned from the server.",
@@ -290,19 +500,17 @@ class Moderation(commands.Cog):
                 )
                 
                 # Schedule unmute
+                await self.scheduler.schedule(
+                    "unmute",
+                    ctx.guild.id,
+                    member.id,
+                    duration * 60,
+                    {"role_id": mute_role.id, "channel_id": ctx.channel.id, "duration": duration}
+                )
                 await ctx.send(embed=embed)
-                await asyncio.sleep(duration * 60)
-                
-                # Check if user still has mute role
-                member = ctx.guild.get_member(member.id)
-                if member and mute_role in member.roles:
-                    await member.remove_roles(mute_role)
-                    embed = EmbedHelper.info_embed(
-                        title="User Unmuted",
-                        description=f"{member.mention} has been automatically unmuted after {duration} minutes."
-                    )
-                    await ctx.send(embed=embed)
             else:
+                # An indefinite mute replaces any timed one
+                await self.scheduler.cancel("unmute", ctx.guild.id, member.id)
                 embed = EmbedHelper.success_embed(
                     title="User Muted",
                     description=f"{member.mention} has been muted indefinitely.",
@@ -356,6 +564,7 @@ class Moderation(commands.Cog):
         
         try:
             await member.remove_roles(mute_role)
+            await self.scheduler.cancel("unmute", ctx.guild.id, member.id)
             embed = EmbedHelper.success_embed(
                 title="User Unmuted",
                 description=f"{member.mention} has been unmuted.",
@@ -583,6 +792,96 @@ class Moderation(commands.Cog):
                     )
             
             await ctx.send(embed=embed)
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def spamlimit(self, ctx, messages: int = None, seconds: float = None):
+        """Set or show how many messages within how many seconds count as spam"""
+        if messages is None:
+            guild_settings = await self.db.get_guild_settings(ctx.guild.id)
+            threshold = max(2, int(guild_settings.get('spam_threshold') or DEFAULT_SPAM_THRESHOLD))
+            timeframe = float(guild_settings.get('spam_timeframe') or DEFAULT_SPAM_TIMEFRAME)
+            embed = EmbedHelper.info_embed(
+                title="Spam Limit",
+                description=f"Sending {threshold} messages within {timeframe:g} seconds counts as spam. Use `!spamlimit <messages> <seconds>` to change it."
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        if seconds is None:
+            seconds = DEFAULT_SPAM_TIMEFRAME
+        if messages < 2 or seconds <= 0:
+            embed = EmbedHelper.error_embed(
+                title="Invalid Spam Limit",
+                description="The limit must be at least 2 messages within a positive number of seconds."
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        result = await self.db.update_guild_settings(ctx.guild.id, {'spam_threshold': messages, 'spam_timeframe': seconds})
+        if result is None or not result.data:
+            embed = EmbedHelper.error_embed(
+                title="Spam Limit",
+                description="The setting couldn't be saved, so the spam limit is unchanged. Please try again later."
+            )
+        else:
+            embed = EmbedHelper.success_embed(
+                title="Spam Limit",
+                description=f"Sending {messages} messages within {seconds:g} seconds now counts as spam."
+            )
+        await ctx.send(embed=embed)
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def raidprotection(self, ctx, enabled: bool = None):
+        """Turn automatic raid protection on or off, or show whether it is on"""
+        if enabled is not None:
+            result = await self.db.update_guild_settings(ctx.guild.id, {'raid_protection_enabled': enabled})
+            if result is None or not result.data:
+                embed = EmbedHelper.error_embed(
+                    title="Raid Protection",
+                    description="The setting couldn't be saved, so raid protection is unchanged. Please try again later."
+                )
+            else:
+                embed = EmbedHelper.success_embed(
+                    title="Raid Protection",
+                    description=f"Raid protection has been turned {'on' if enabled else 'off'}."
+                )
+        else:
+            guild_settings = await self.db.get_guild_settings(ctx.guild.id)
+            enabled = guild_settings.get('raid_protection_enabled', False)
+            embed = EmbedHelper.info_embed(
+                title="Raid Protection",
+                description=f"Raid protection is {'on' if enabled else 'off'}. Use `!raidprotection on` or `!raidprotection off` to change it."
+            )
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def duplicatedetection(self, ctx, enabled: bool = None):
+        """Turn detection of the same message posted by many new accounts on or off, or show whether it is on"""
+        if enabled is not None:
+            result = await self.db.update_guild_settings(ctx.guild.id, {'duplicate_detection_enabled': enabled})
+            if result is None or not result.data:
+                embed = EmbedHelper.error_embed(
+                    title="Duplicate Detection",
+                    description="The setting couldn't be saved, so duplicate message detection is unchanged. Please try again later."
+                )
+            else:
+                embed = EmbedHelper.success_embed(
+                    title="Duplicate Detection",
+                    description=f"Duplicate message detection has been turned {'on' if enabled else 'off'}."
+                )
+        else:
+            guild_settings = await self.db.get_guild_settings(ctx.guild.id)
+            enabled = guild_settings.get('duplicate_detection_enabled', False)
+            embed = EmbedHelper.info_embed(
+                title="Duplicate Detection",
+                description=f"Duplicate message detection is {'on' if enabled else 'off'}. Use `!duplicatedetection on` or `!duplicatedetection off` to change it."
+            )
+        
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot)) 
\ No newline at end of file
@@ -8,14 +8,13 @@ import json
 import time
 import os
 from utils.embed_helper import EmbedHelper
-from utils.database import Database
 
 class Utility(commands.Cog):
     """Utility commands for practical server functions"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.db = Database()
+        self.db = bot.db
         self.reminders = {}  # Format: {reminder_id: (channel_id, user_id, message, end_time)}
         self.polls = {}  # Format: {message_id: {"question": question, "options": options, "votes": {}, "end_time": end_time}}
     
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from utils.economy_service import DEFAULT_STARTING_BALANCE, EconomyService
+from utils.economy_store import EconomyStore
+
+
+def make_service(tmp_path):
+    return EconomyService(db_path=str(tmp_path / "economy.db"), json_path=str(tmp_path / "economy.json"))
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    # The shop catalog is read relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+def test_store_round_trips_users_and_meta(tmp_path):
+    store = EconomyStore(str(tmp_path / "economy.db"))
+    store.setup()
+    store.save_users({"1": {"balance": 10, "transactions": []}}, meta={"schema_version": "2"})
+    store.close()
+
+    store = EconomyStore(str(tmp_path / "economy.db"))
+    assert store.load_all()["1"]["balance"] == 10
+    assert store.get_meta("schema_version") == "2"
+    store.close()
+
+def test_transfer_moves_money_and_survives_a_restart(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        await service.load()
+        assert await service.transfer("1", "2", 200)
+        assert not await service.transfer("1", "2", 10_000)
+        await service.close()
+
+        service = make_service(tmp_path)
+        await service.load()
+        balances = service.users["1"]["balance"], service.users["2"]["balance"]
+        await service.close()
+        return balances
+
+    assert asyncio.run(run()) == (DEFAULT_STARTING_BALANCE - 200, DEFAULT_STARTING_BALANCE + 200)
+
+def test_concurrent_transfers_never_overdraw(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        await service.load()
+        results = await asyncio.gather(*(service.transfer("1", "2", 100) for _ in range(10)))
+        balances = service.users["1"]["balance"], service.users["2"]["balance"]
+        await service.close()
+        return results, balances
+
+    results, balances = asyncio.run(run())
+    assert results.count(True) == DEFAULT_STARTING_BALANCE // 100
+    assert balances == (0, 2 * DEFAULT_STARTING_BALANCE)
+
+def test_records_are_not_created_before_a_load(tmp_path):
+    service = make_service(tmp_path)
+    with pytest.raises(RuntimeError):
+        service.get_user("1")
+    asyncio.run(service.close())
+
+def test_chatters_without_economy_data_earn_xp_without_a_balance(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        await service.load()
+        assert service.xp.award_message("1", channel_id=10, now=1000) > 0
+        level_ups = service.xp.flush()
+        assert "1" not in service.users
+        assert service.get_global_leaderboard("xp").rank("1") is None
+        earned = service.xp.get_xp("1")
+        await service.close()
+
+        service = make_service(tmp_path)
+        await service.load()
+        assert "1" not in service.users
+        assert service.xp.get_xp("1") == earned
+        # Joining the economy keeps the XP
+        assert service.get_user("1")["xp"] == earned
+        assert not service.xp_only
+        await service.close()
+        return level_ups
+
+    assert asyncio.run(run()) == {}
+
+def test_level_ups_are_reported_with_the_channel(tmp_path):
+    async def run():
+        service = make_service(tmp_path)
+        await service.load()
+        service.get_xp_record("1")["xp"] = 95
+        service.xp.award_message("1", channel_id=10, now=1000)
+        level_ups = service.xp.flush()
+        await service.close()
+        return level_ups
+
+    assert asyncio.run(run()) == {"1": (1, 10)}
@@ -0,0 +1,73 @@
+from utils.link_matcher import GuildLinkMatchers, LinkMatcher, extract_links, normalize_link, parse_link
+
+
+def test_parse_link_drops_scheme_user_info_and_port():
+    assert parse_link("https://user@Example.COM:8080/Path?q=1") == ("example.com", "/Path?q=1")
+
+def test_parse_link_strips_surrounding_punctuation():
+    assert parse_link("**example.com/page**,") == ("example.com", "/page")
+
+def test_parse_link_rejects_text_that_is_not_a_link():
+    assert parse_link("hello") is None
+    assert parse_link("end.") is None
+    assert parse_link("version 1.x") is None
+
+def test_extract_links_splits_on_brackets_and_whitespace():
+    links = list(extract_links("see <https://a.com/x> and (b.org) or [c.net?y]"))
+    assert links == [("a.com", "/x"), ("b.org", ""), ("c.net", "/?y")]
+
+def test_extract_links_does_not_stall_on_pathological_input():
+    assert list(extract_links("a." * 50000)) == []
+
+def test_normalize_link():
+    assert normalize_link("HTTPS://www.Evil.com/") == "evil.com"
+    assert normalize_link("evil.com/Path/") == "evil.com/Path"
+
+def test_domain_entry_matches_domain_and_subdomains_only():
+    matcher = LinkMatcher(["evil.com"])
+    assert matcher.find("go to evil.com now") == "evil.com"
+    assert matcher.find("http://x.evil.com/page") == "evil.com"
+    assert matcher.find("notevil.com") is None
+    assert matcher.find("evil.company.org") is None
+
+def test_path_entry_matches_links_that_start_with_it():
+    matcher = LinkMatcher(["example.com/bad"])
+    assert matcher.find("https://example.com/bad/thing") == "example.com/bad"
+    assert matcher.find("https://example.com/good") is None
+
+def test_matcher_finds_any_of_many_entries_in_one_message():
+    matcher = LinkMatcher([f"site{i}.com" for i in range(200)])
+    assert matcher.find("a.org b.org site137.com/x") == "site137.com"
+    assert matcher.find("a.org b.org") is None
+
+def test_empty_matcher_finds_nothing():
+    assert LinkMatcher([]).find("evil.com") is None
+
+def test_guild_matchers_recompile_only_when_links_change():
+    matchers = GuildLinkMatchers()
+    links = ["evil.com"]
+    first = matchers.get(1, links)
+    assert matchers.get(1, links) is first
+    assert matchers.get(1, ["evil.com"]) is first
+    assert matchers.get(1, ["other.com"]) is not first
+
+def test_format_characters_do_not_hide_a_link():
+    matcher = LinkMatcher(["evil.com"])
+    assert matcher.find("x.evil.com\u200b") == "evil.com"
+    assert matcher.find("ev\u200bil.com") == "evil.com"
+    assert matcher.find("\u2060evil\u200d.com/x") == "evil.com"
+
+def test_entries_that_are_not_links_match_as_text():
+    matcher = LinkMatcher(["BadWord", "evil.com"])
+    assert matcher.find("this has a badword in it") == "badword"
+    assert matcher.find("BADWORDS") == "badword"
+    assert matcher.find("bad\u200bword") == "badword"
+    assert matcher.find("nothing here") is None
+    assert len(matcher) == 2
+
+def test_guild_matchers_remember_a_refreshed_list_with_the_same_links():
+    matchers = GuildLinkMatchers()
+    first = matchers.get(1, ["evil.com"])
+    refreshed = ["evil.com"]
+    assert matchers.get(1, refreshed) is first
+    assert matchers._matchers[1][0] is refreshed
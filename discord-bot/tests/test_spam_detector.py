@@ -0,0 +1,53 @@
+from utils.spam_detector import SpamDetector
+
+
+def test_threshold_messages_within_timeframe_is_spam():
+    detector = SpamDetector()
+    assert not detector.hit(1, 1, threshold=3, timeframe=5, now=100.0)
+    assert not detector.hit(1, 1, threshold=3, timeframe=5, now=101.0)
+    assert detector.hit(1, 1, threshold=3, timeframe=5, now=102.0)
+
+def test_messages_spread_over_more_than_the_timeframe_are_not_spam():
+    detector = SpamDetector()
+    for now in (100.0, 103.0, 106.0, 109.0):
+        assert not detector.hit(1, 1, threshold=3, timeframe=5, now=now)
+
+def test_window_slides_instead_of_resetting_at_boundaries():
+    detector = SpamDetector()
+    # A fixed window [100, 105) would split these across two windows
+    detector.hit(1, 1, threshold=3, timeframe=5, now=103.0)
+    detector.hit(1, 1, threshold=3, timeframe=5, now=104.9)
+    assert detector.hit(1, 1, threshold=3, timeframe=5, now=105.1)
+
+def test_a_burst_is_reported_once():
+    detector = SpamDetector()
+    results = [detector.hit(1, 1, threshold=3, timeframe=5, now=100.0 + i / 10) for i in range(5)]
+    assert results == [False, False, True, False, False]
+
+def test_users_and_guilds_are_counted_separately():
+    detector = SpamDetector()
+    detector.hit(1, 1, threshold=2, timeframe=5, now=100.0)
+    assert not detector.hit(1, 2, threshold=2, timeframe=5, now=100.5)
+    assert not detector.hit(2, 1, threshold=2, timeframe=5, now=100.5)
+    assert detector.hit(1, 1, threshold=2, timeframe=5, now=101.0)
+
+def test_reset_forgets_recent_messages():
+    detector = SpamDetector()
+    detector.hit(1, 1, threshold=2, timeframe=5, now=100.0)
+    detector.reset(1, 1)
+    assert not detector.hit(1, 1, threshold=2, timeframe=5, now=101.0)
+
+def test_idle_users_are_evicted():
+    detector = SpamDetector(tick=1.0, slots=8)
+    for user_id in range(100):
+        detector.hit(1, user_id, threshold=3, timeframe=5, now=100.0)
+    assert len(detector) == 100
+    detector.hit(1, "active", threshold=3, timeframe=5, now=200.0)
+    detector.hit(1, "active", threshold=3, timeframe=5, now=210.0)
+    assert len(detector) == 1
+
+def test_active_users_are_kept_past_their_first_window():
+    detector = SpamDetector(tick=1.0, slots=8)
+    for now in range(100, 120, 2):
+        detector.hit(1, 1, threshold=10, timeframe=5, now=float(now))
+    assert len(detector) == 1
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("modubot")
+
+class MessageAnimator:
+    """Plays message animations as scheduled edits, paced per channel.
+
+    Commands hand over a list of frames and return right away; one task per channel
+    then performs the edits for every animation in that channel. Edits in a channel are
+    spaced at least `edit_interval` seconds apart, and when a message falls behind
+    schedule the frames it missed are skipped in favour of the newest one that is due,
+    so bursts cost fewer edits and the final frame is always shown.
+    """
+
+    def __init__(self, edit_interval=1.0):
+        self.edit_interval = edit_interval
+        self._animations = {}  # Format: {channel_id: {key: (edit, [(due, kwargs), ...])}}
+        self._wakeups = {}  # Format: {channel_id: asyncio.Event}
+        self._tasks = {}  # Format: {channel_id: asyncio.Task}
+        self._last_edit = {}  # Format: {channel_id: loop time of the last edit}
+
+    def play(self, channel_id, key, edit, frames):
+        """Schedule an animation.
+
+        `edit` is a coroutine function such as `message.edit`, `key` identifies the message
+        (a new animation for the same key replaces the old one) and `frames` is a list of
+        (seconds_from_now, edit_kwargs) pairs in order.
+        """
+        if not frames:
+            return
+
+        now = asyncio.get_running_loop().time()
+        animations = self._animations.setdefault(channel_id, {})
+        animations[key] = (edit, [(now + delay, kwargs) for delay, kwargs in frames])
+
+        task = self._tasks.get(channel_id)
+        if task is None or task.done():
+            self._wakeups[channel_id] = asyncio.Event()
+            self._tasks[channel_id] = asyncio.create_task(self._run(channel_id))
+        else:
+            self._wakeups[channel_id].set()
+
+    async def close(self):
+        """Stop all animations; frames not yet shown are dropped"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._animations.clear()
+        self._wakeups.clear()
+        self._tasks.clear()
+
+    async def _run(self, channel_id):
+        loop = asyncio.get_running_loop()
+        animations = self._animations[channel_id]
+        wakeup = self._wakeups[channel_id]
+
+        while animations:
+            # The message whose next frame is due first goes next
+            key = min(animations, key=lambda key: animations[key][1][0][0])
+            edit, frames = animations[key]
+
+            delay = max(frames[0][0], self._last_edit.get(channel_id, 0) + self.edit_interval) - loop.time()
+            if delay > 0:
+                # Wake early if a new animation arrives, since it may be due sooner
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Skip straight to the newest frame that is already due
+            now = loop.time()
+            while len(frames) > 1 and frames[1][0] <= now:
+                frames.pop(0)
+            _, kwargs = frames.pop(0)
+            if not frames:
+                del animations[key]
+
+            self._last_edit[channel_id] = now
+            try:
+                await edit(**kwargs)
+            except Exception as e:
+                logger.error(f"Error editing animated message in channel {channel_id}: {e}")
+
+        del self._animations[channel_id]
+        del self._wakeups[channel_id]
+        del self._tasks[channel_id]
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """A bounded LRU cache whose entries expire after a fixed time-to-live."""
+
+    def __init__(self, maxsize=1000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # Format: {key: (expires_at, value)}
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            # Expired entries are dropped lazily on access
+            del self._data[key]
+            return default
+
+        # Mark as most recently used
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if the cache is full"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove a single key from the cache"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+class UserLocks:
+    """Keyed asyncio locks that serialize balance-changing operations per user.
+
+    Locks are created on first use and dropped once nobody holds or waits on them, so
+    the table only ever holds users with an operation in flight. Acquiring an unheld
+    lock never suspends, so the uncontended path costs a dict lookup.
+    """
+
+    def __init__(self):
+        self._locks = {}  # Format: {user_id: [lock, holders_and_waiters]}
+
+    @asynccontextmanager
+    async def hold(self, *user_ids):
+        """Hold the locks of one or more users.
+
+        Locks are always taken in sorted order, so two transfers between the same pair of
+        users in opposite directions can't deadlock.
+        """
+        keys = sorted({str(user_id) for user_id in user_ids})
+        acquired = []
+        try:
+            for key in keys:
+                entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+                entry[1] += 1
+                try:
+                    await entry[0].acquire()
+                except BaseException:
+                    self._release_entry(key, locked=False)
+                    raise
+                acquired.append(key)
+            yield
+        finally:
+            for key in reversed(acquired):
+                self._release_entry(key, locked=True)
+
+    def is_locked(self, user_id):
+        entry = self._locks.get(str(user_id))
+        return entry is not None and entry[0].locked()
+
+    def _release_entry(self, key, locked):
+        entry = self._locks[key]
+        if locked:
+            entry[0].release()
+        entry[1] -= 1
+        if not entry[1]:
+            del self._locks[key]
@@ -0,0 +1,76 @@
+import time
+import datetime
+from collections import Counter
+
+# Days of per-day mint and burn totals to keep
+METRICS_HISTORY_DAYS = 30
+
+class EconomyMetrics:
+    """Running money-supply aggregates, updated as balances change.
+
+    Total supply and per-guild supply follow every balance change by its delta, and
+    coins entering (minted) or leaving (burned) the economy are counted per source,
+    both in total and per UTC day. Every figure is read in O(1) rather than by
+    scanning user records.
+    """
+
+    def __init__(self):
+        self.supply = 0
+        self.guild_supply = Counter()  # Format: {guild_id: coins held by members}
+        self.minted = Counter()  # Format: {source: coins}
+        self.burned = Counter()  # Format: {source: coins}
+        self.daily = {}  # Format: {"YYYY-MM-DD": {"minted": Counter, "burned": Counter}}
+
+    def balance_changed(self, delta, guild_ids=()):
+        """Apply a change in one user's balance to the supply totals"""
+        self.supply += delta
+        for guild_id in guild_ids:
+            self.guild_supply[guild_id] += delta
+
+    def mint(self, source, amount):
+        """Count coins created by `source` (e.g. "daily" or a game win)"""
+        if amount > 0:
+            self.minted[source] += amount
+            self._today()["minted"][source] += amount
+
+    def burn(self, source, amount):
+        """Count coins destroyed by `source` (e.g. "shop" or a game loss)"""
+        if amount > 0:
+            self.burned[source] += amount
+            self._today()["burned"][source] += amount
+
+    def day(self, date=None):
+        """Get the minted and burned totals of a UTC day (today by default)"""
+        key = (date or datetime.datetime.now(datetime.timezone.utc).date()).isoformat()
+        return self.daily.get(key, {"minted": Counter(), "burned": Counter()})
+
+    def to_dict(self):
+        """Get the persistent counters, for saving. Supply is rebuilt from balances on load."""
+        return {
+            "minted": dict(self.minted),
+            "burned": dict(self.burned),
+            "daily": {
+                day: {"minted": dict(totals["minted"]), "burned": dict(totals["burned"])}
+                for day, totals in self.daily.items()
+            },
+            "saved_at": time.time()
+        }
+
+    def load_dict(self, data):
+        """Restore counters saved by to_dict"""
+        self.minted = Counter(data.get("minted", {}))
+        self.burned = Counter(data.get("burned", {}))
+        self.daily = {
+            day: {"minted": Counter(totals.get("minted", {})), "burned": Counter(totals.get("burned", {}))}
+            for day, totals in data.get("daily", {}).items()
+        }
+
+    def _today(self):
+        key = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        totals = self.daily.get(key)
+        if totals is None:
+            totals = self.daily[key] = {"minted": Counter(), "burned": Counter()}
+            # Keys are ISO dates, so they sort chronologically
+            for old_key in sorted(self.daily)[:-METRICS_HISTORY_DAYS]:
+                del self.daily[old_key]
+        return totals
@@ -0,0 +1,176 @@
+import json
+import asyncio
+
+# Rows requested per page when reading every user record
+ECONOMY_POSTGRES_PAGE_SIZE = 1000
+
+# Tables and the save function behind PostgresEconomyStore
+ECONOMY_POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS economy_users (
+        user_id TEXT PRIMARY KEY,
+        balance BIGINT NOT NULL DEFAULT 0,
+        data JSONB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS economy_users_balance ON economy_users (balance)",
+    """
+    CREATE TABLE IF NOT EXISTS economy_transactions (
+        id BIGSERIAL PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        data JSONB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS economy_transactions_user ON economy_transactions (user_id, id)",
+    """
+    CREATE TABLE IF NOT EXISTS economy_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION economy_save(
+        p_users jsonb,
+        p_archived jsonb DEFAULT '[]'::jsonb,
+        p_meta jsonb DEFAULT '{}'::jsonb
+    )
+    RETURNS void
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        INSERT INTO economy_users (user_id, balance, data)
+        SELECT u.key, COALESCE((u.value->>'balance')::bigint, 0), u.value
+        FROM jsonb_each(p_users) AS u
+        ON CONFLICT (user_id) DO UPDATE
+        SET balance = excluded.balance, data = excluded.data;
+
+        INSERT INTO economy_transactions (user_id, data)
+        SELECT a.value->>0, a.value->1
+        FROM jsonb_array_elements(p_archived) WITH ORDINALITY AS a(value, position)
+        ORDER BY a.position;
+
+        INSERT INTO economy_meta (key, value)
+        SELECT m.key, m.value
+        FROM jsonb_each_text(p_meta) AS m
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+    END;
+    $$
+    """
+]
+
+class PostgresEconomyStore:
+    """The economy data in the Supabase Postgres database.
+
+    A drop-in for EconomyStore that keeps the economy in the hosted database instead of a
+    local file. Requests go through the bot's Database, so they share its connection
+    pool and its limit on requests in flight. Writes call the economy_save function, so
+    a batch of records, archived transactions and meta values is saved in one
+    transaction, like one SQLite transaction in EconomyStore.
+
+    Methods block like EconomyStore's; call them from a worker thread. Each request is
+    run on the event loop the store was created on, where the pool lives, and the
+    calling thread waits for it.
+
+    Only one bot process may use the economy tables at a time: each process holds every
+    record in memory and saves whole records, so two processes would overwrite each
+    other's changes.
+    """
+
+    def __init__(self, db):
+        if not db.is_connected:
+            raise RuntimeError("ECONOMY_BACKEND is postgres but SUPABASE_URL and SUPABASE_KEY are not set")
+        self.db = db
+        self._loop = asyncio.get_running_loop()
+
+    def _wait(self, coro):
+        """Run a Database coroutine on the store's event loop and wait for its result"""
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            # Waiting here would block the loop the coroutine has to run on
+            coro.close()
+            raise RuntimeError("PostgresEconomyStore blocks; call it from a worker thread")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _send(self, method, path, params=None, payload=None, headers=None):
+        content = json.dumps(payload, separators=(",", ":")) if payload is not None else None
+        response = self._wait(self.db.send_request(method, path, params=params, content=content, headers=headers))
+        response.raise_for_status()
+        return response
+
+    def setup(self):
+        """Create the economy tables and save function if they don't exist, or raise if that fails"""
+        for statement in ECONOMY_POSTGRES_SCHEMA:
+            # Runs through the execute function, since execute_sql can't run statements that return nothing
+            if not self._wait(self.db.execute_schema_sql(statement)):
+                raise RuntimeError("Could not create the economy tables; see the schema SQL error above")
+
+    def _get(self, table, params):
+        return self._send("GET", f"/{table}", params=params).json()
+
+    def load_all(self):
+        """Load every user record into a dict keyed by user ID"""
+        users = {}
+        offset = 0
+        while True:
+            rows = self._get("economy_users", {
+                "select": "user_id,data",
+                "order": "user_id",
+                "limit": ECONOMY_POSTGRES_PAGE_SIZE,
+                "offset": offset
+            })
+            users.update((row["user_id"], row["data"]) for row in rows)
+            if len(rows) < ECONOMY_POSTGRES_PAGE_SIZE:
+                return users
+            offset += len(rows)
+
+    def get_user(self, user_id):
+        rows = self._get("economy_users", {"select": "data", "user_id": f"eq.{user_id}"})
+        return rows[0]["data"] if rows else None
+
+    def save_user(self, user_id, data):
+        self.save_users({user_id: data})
+
+    def save_users(self, users, archived=(), meta=None):
+        """Insert or update several user records in one transaction"""
+        self._send("POST", "/rpc/economy_save", payload={
+            "p_users": {str(user_id): data for user_id, data in users.items()},
+            "p_archived": [[str(user_id), transaction] for user_id, transaction in archived],
+            "p_meta": meta or {}
+        })
+
+    def get_transactions(self, user_id, limit=10, offset=0):
+        """Read a page of a user's archived transactions, newest first"""
+        return [
+            row["data"] for row in self._get("economy_transactions", {
+                "select": "data",
+                "user_id": f"eq.{user_id}",
+                "order": "id.desc",
+                "limit": limit,
+                "offset": offset
+            })
+        ]
+
+    def count_transactions(self, user_id):
+        response = self._send(
+            "HEAD", "/economy_transactions",
+            params={"user_id": f"eq.{user_id}"},
+            headers={"Prefer": "count=exact"}
+        )
+        # Content-Range looks like "*/42"
+        return int(response.headers.get("content-range", "*/0").split("/")[-1])
+
+    def delete_user(self, user_id):
+        self._send("DELETE", "/economy_users", params={"user_id": f"eq.{user_id}"})
+
+    def get_meta(self, key, default=None):
+        rows = self._get("economy_meta", {"select": "value", "key": f"eq.{key}"})
+        return rows[0]["value"] if rows else default
+
+    def set_meta(self, key, value):
+        self.save_users({}, meta={key: value})
+
+    def close(self):
+        """Nothing to do; the connection pool belongs to Database, which closes it"""
@@ -0,0 +1,489 @@
+import os
+import json
+import time
+import asyncio
+import logging
+
+from utils.economy_store import EconomyWriter, create_economy_store, migrate_from_json
+from utils.economy_locks import UserLocks
+from utils.guild_members import GuildMemberIndex
+from utils.leaderboard import GuildLeaderboards
+from utils.economy_metrics import EconomyMetrics
+from utils.levels import XpTracker
+from utils.shop_catalog import ShopCatalog, item_income_rate
+
+logger = logging.getLogger("modubot")
+
+# File path to store economy data
+ECONOMY_DB_FILE = os.getenv("ECONOMY_DB_FILE", "data/economy.db")
+
+# Legacy JSON economy file, imported into the database on first load
+ECONOMY_FILE = "data/economy.json"
+
+# Seconds between batched writes of changed economy data
+ECONOMY_SAVE_INTERVAL = float(os.getenv("ECONOMY_SAVE_INTERVAL", 5))
+
+# Attempts at loading the economy data at startup, and seconds between them
+ECONOMY_LOAD_ATTEMPTS = int(os.getenv("ECONOMY_LOAD_ATTEMPTS", 3))
+ECONOMY_LOAD_RETRY_DELAY = float(os.getenv("ECONOMY_LOAD_RETRY_DELAY", 5))
+
+# Recent transactions kept per user; older ones are moved to the archive table
+TRANSACTION_HISTORY_SIZE = 50
+
+DEFAULT_STARTING_BALANCE = 500
+
+# Passive income rates are stored per this many seconds (1 hour)
+INCOME_RATE_PERIOD = 3600
+
+# Leaderboard categories and the record field each one ranks by. Everyone with economy
+# data is ranked by balance; other categories only rank users with a non-zero value.
+RANKED_FIELDS = {
+    "balance": "balance",
+    "income": "income_rate",
+    "xp": "xp"
+}
+
+# Version of the user record layout below; bump it and add a step to `migrate_schema`
+# whenever stored records need rewriting
+SCHEMA_VERSION = 2
+
+def new_xp_record():
+    """Create the record that holds the XP of someone who chats but has no economy data"""
+    return {"xp": 0, "xp_only": True}
+
+def new_user_record():
+    """Create the economy record of a user who has never used the economy"""
+    return {
+        "balance": DEFAULT_STARTING_BALANCE,
+        "last_daily": 0,
+        "inventory": [],  # Format: [{"id": item_id, "name": name, "purchased_at": timestamp}]
+        "total_earned": DEFAULT_STARTING_BALANCE,
+        "total_spent": 0,
+        "transactions": []  # The newest TRANSACTION_HISTORY_SIZE entries
+    }
+
+
+class EconomyService:
+    """The economy engine shared by every economy cog.
+
+    Holds the only in-memory copy of the user records and the only path to the
+    database, along with the per-category rankings, the guild membership index, the
+    per-user locks, the money-supply metrics, the message XP tracker and the shop catalog. Cogs keep their commands and presentation and
+    call into this for state.
+    """
+
+    def __init__(self, db=None, db_path=ECONOMY_DB_FILE, json_path=ECONOMY_FILE, save_interval=ECONOMY_SAVE_INTERVAL):
+        self.json_path = json_path
+        self.users = {}  # Format: {user_id: record}
+        self.xp_only = {}  # Format: {user_id: XP-only record}, for chatters with no economy data
+        self.store = create_economy_store(db_path, db)
+        self.metrics = EconomyMetrics()
+        self.writer = EconomyWriter(
+            self.store,
+            self._stored_record,
+            save_interval,
+            lambda: {"metrics": json.dumps(self.metrics.to_dict(), separators=(",", ":"))}
+        )
+        self.user_locks = UserLocks()
+        self.guild_members = GuildMemberIndex()
+        self.rankings = {category: GuildLeaderboards(self.guild_members) for category in RANKED_FIELDS}
+        self.xp = XpTracker(self)
+        self.catalog = ShopCatalog()
+        self.catalog.on_change(self._catalog_changed)
+        self.loaded = False
+
+    async def load(self):
+        """Migrate stored data to the current schema and load every user record.
+
+        Retries a failed load ECONOMY_LOAD_ATTEMPTS times and then raises. Until a load
+        succeeds the service stays unloaded and `get_user` refuses to create records, so
+        nothing can be saved over the stored ones.
+        """
+        if self.loaded:
+            return
+
+        self.catalog.load()
+        self.catalog.watch()
+
+        for attempt in range(1, ECONOMY_LOAD_ATTEMPTS + 1):
+            try:
+                # The store blocks, and with the postgres backend every step is a network request
+                await asyncio.to_thread(self._load_records)
+                break
+            except Exception as e:
+                self.users.clear()
+                self.xp_only.clear()
+                if attempt == ECONOMY_LOAD_ATTEMPTS:
+                    raise RuntimeError(f"Could not load economy data after {attempt} attempts: {e}") from e
+                logger.error(f"Error loading economy data, retrying in {ECONOMY_LOAD_RETRY_DELAY}s: {e}")
+                await asyncio.sleep(ECONOMY_LOAD_RETRY_DELAY)
+        logger.info(f"Loaded economy data for {len(self.users)} users")
+
+        for user_id, data in self.users.items():
+            self.metrics.balance_changed(data["balance"])
+            self._rank(user_id, data)
+
+        # Records saved before income rates were tracked only have an inventory
+        for user_id, data in self.users.items():
+            if "income_rate" not in data:
+                self.migrate_income_sources(user_id, data)
+        self.loaded = True
+
+    def _load_records(self):
+        self.store.setup()
+        migrate_from_json(self.store, self.json_path)
+        for user_id, data in self.store.load_all().items():
+            # XP-only records share the table but aren't economy users
+            (self.xp_only if data.get("xp_only") else self.users)[user_id] = data
+        self.migrate_schema()
+        self.metrics.load_dict(json.loads(self.store.get_meta("metrics", "{}")))
+
+    def migrate_schema(self):
+        """Bring loaded records up to SCHEMA_VERSION and write back the ones that changed"""
+        version = int(self.store.get_meta("schema_version", 1))
+        if version >= SCHEMA_VERSION:
+            return
+
+        changed = {}
+        archived = []  # Format: [(user_id, transaction), ...]
+        for user_id, data in self.users.items():
+            if version < 2 and self._migrate_v2(user_id, data, archived):
+                changed[user_id] = data
+
+        # One transaction, so a crash mid-migration leaves the old version to retry
+        self.store.save_users(changed, archived)
+        self.store.set_meta("schema_version", str(SCHEMA_VERSION))
+        logger.info(f"Migrated {len(changed)} economy records from schema {version} to {SCHEMA_VERSION}")
+
+    def _migrate_v2(self, user_id, data, archived):
+        """Merge the prefix and slash command cogs' layouts into one record format"""
+        changed = False
+        for key, value in new_user_record().items():
+            if key not in data:
+                data[key] = value if key != "total_earned" else data.get("balance", value)
+                changed = True
+
+        # The prefix cog keyed inventory entries by "item_id", the slash cog by "id"
+        for item in data["inventory"]:
+            if "item_id" in item:
+                item.setdefault("id", item.pop("item_id"))
+                changed = True
+
+        # Histories saved before the archive existed can be any length
+        overflow = len(data["transactions"]) - TRANSACTION_HISTORY_SIZE
+        if overflow > 0:
+            archived.extend((user_id, transaction) for transaction in data["transactions"][:overflow])
+            del data["transactions"][:overflow]
+            changed = True
+        return changed
+
+    def get_user(self, user_id):
+        """Get a user's economy record, creating it if it doesn't exist"""
+        if not self.loaded:
+            # A record created now would be saved over the user's stored one
+            raise RuntimeError("Economy data is not loaded")
+        user_id = str(user_id)
+        if user_id not in self.users:
+            self.users[user_id] = new_user_record()
+            # XP earned by chatting before joining the economy carries over
+            xp_record = self.xp_only.pop(user_id, None)
+            if xp_record is not None:
+                self.users[user_id]["xp"] = xp_record["xp"]
+            self.metrics.mint("starting_balance", DEFAULT_STARTING_BALANCE)
+            self.mark_dirty(user_id)
+        return self.users[user_id]
+
+    def get_xp_record(self, user_id):
+        """Get the record a user's XP is kept in: their economy record, or an XP-only one created for them"""
+        user_id = str(user_id)
+        record = self.users.get(user_id)
+        if record is None:
+            record = self.xp_only.get(user_id)
+            if record is None:
+                record = self.xp_only[user_id] = new_xp_record()
+        return record
+
+    def _stored_record(self, user_id):
+        return self.users.get(user_id) or self.xp_only.get(user_id)
+
+    def mark_dirty(self, *user_ids):
+        """Mark users' records as changed so they are re-ranked, counted and saved by the background writer"""
+        for user_id in user_ids:
+            user_id = str(user_id)
+            record = self.users.get(user_id)
+            if record is None:
+                continue  # XP-only records are saved but never ranked or counted
+
+            # The balance ranking still holds the previous balance, so the difference is the change
+            delta = record["balance"] - (self.rankings["balance"].global_index.score(user_id) or 0)
+            if delta:
+                self.metrics.balance_changed(delta, self.guild_members.guilds_of(user_id))
+            self._rank(user_id, record)
+        self.writer.mark_dirty(*user_ids)
+
+    def _rank(self, user_id, record):
+        for category, field in RANKED_FIELDS.items():
+            value = record.get(field, 0)
+            if value or category == "balance":
+                self.rankings[category].update(user_id, value)
+            else:
+                self.rankings[category].remove_user(user_id)
+
+    # Balance operations. Nothing here awaits, so each one is atomic on the event loop.
+    # Credits only ever add and are safe at any time; anything that takes money runs
+    # under the user's lock so it can't race a command that checked the balance earlier
+    # and is still awaiting (e.g. a role purchase).
+
+    def try_debit(self, user_id, amount):
+        """Take money from a user if they can afford it. Call with the user's lock held."""
+        user_data = self.get_user(user_id)
+        if user_data["balance"] < amount:
+            return False
+        user_data["balance"] -= amount
+        self.mark_dirty(user_id)
+        return True
+
+    def credit(self, user_id, amount):
+        """Give money to a user"""
+        self.get_user(user_id)["balance"] += amount
+        self.mark_dirty(user_id)
+
+    async def place_bet(self, user_id, amount):
+        """Take a bet up front so it can't be spent again while the game plays out"""
+        async with self.user_locks.hold(user_id):
+            return self.try_debit(user_id, amount)
+
+    async def transfer(self, sender_id, receiver_id, amount):
+        """Move money between two users, holding both locks in a fixed order"""
+        async with self.user_locks.hold(sender_id, receiver_id):
+            if not self.try_debit(sender_id, amount):
+                return False
+            self.credit(receiver_id, amount)
+            return True
+
+    def claim_daily(self, user_id, reward, cooldown=86400):
+        """Pay a user's daily reward if it is due. Returns the seconds left until it is, or 0 once paid."""
+        user_data = self.get_user(user_id)
+        now = time.time()
+        remaining = user_data["last_daily"] + cooldown - now
+        if user_data["last_daily"] > 0 and remaining > 0:
+            return remaining
+
+        user_data["balance"] += reward
+        user_data["last_daily"] = now
+        user_data["total_earned"] += reward
+        self.metrics.mint("daily", reward)
+        self.mark_dirty(user_id)
+        return 0
+
+    # Passive income
+
+    def accrued_income(self, user_data, now=None):
+        """Get the income a user has accrued but not collected, in O(1) from their cached rate"""
+        now = time.time() if now is None else now
+        elapsed = max(0, now - user_data.get("last_income_collection", now))
+        return user_data.get("pending_income", 0) + user_data.get("income_rate", 0) * elapsed / INCOME_RATE_PERIOD
+
+    def add_income_source(self, user_id, item_id, count=1):
+        """Update a user's cached income rate after they gain (or, with a negative count, lose) an item"""
+        if not self.catalog.income_rate(item_id):
+            return
+
+        user_data = self.get_user(user_id)
+        self._bank_income(user_data)
+
+        sources = user_data.setdefault("income_sources", {})
+        sources[item_id] = sources.get(item_id, 0) + count
+        if sources[item_id] <= 0:
+            del sources[item_id]
+        self.update_income_rate(user_id)
+
+    def update_income_rate(self, user_id):
+        """Recompute a user's hourly income from their owned source counts and re-rank them"""
+        user_data = self.users[str(user_id)]
+        user_data["income_rate"] = sum(
+            self.catalog.income_rate(item_id, INCOME_RATE_PERIOD) * count
+            for item_id, count in user_data.get("income_sources", {}).items()
+        )
+        self.mark_dirty(user_id)
+
+    def migrate_income_sources(self, user_id, user_data):
+        """Build the cached income sources of a record saved before they were tracked"""
+        sources = {}
+        first_purchase = None
+        for item in user_data.get("inventory", []):
+            if self.catalog.income_rate(item.get("id")):
+                sources[item["id"]] = sources.get(item["id"], 0) + 1
+                purchased_at = item.get("purchased_at", 0)
+                first_purchase = purchased_at if first_purchase is None else min(first_purchase, purchased_at)
+
+        user_data["income_sources"] = sources
+        if sources:
+            # Income used to accrue from the last collection, or from the first purchase if never collected
+            user_data["last_income_collection"] = user_data.get("last_income_collection") or first_purchase
+        self.update_income_rate(user_id)
+
+    def _bank_income(self, user_data, now=None):
+        # Keep what was earned at the old rate so a new rate only applies from now on
+        now = time.time() if now is None else now
+        user_data["pending_income"] = self.accrued_income(user_data, now)
+        user_data["last_income_collection"] = now
+
+    def _catalog_changed(self, old_items):
+        """Re-rate the owners of items whose income changed in a catalog reload"""
+        if not self.loaded:
+            return
+        changed = {
+            item_id for item_id in set(old_items) | {item["id"] for item in self.catalog.items()}
+            if self.catalog.income_rate(item_id) != item_income_rate(old_items.get(item_id))
+        }
+        if not changed:
+            return
+
+        now = time.time()
+        owners = [user_id for user_id, data in self.users.items() if changed & data.get("income_sources", {}).keys()]
+        for user_id in owners:
+            user_data = self.users[user_id]
+            # Bank at the old rate, which is still cached in the record
+            self._bank_income(user_data, now)
+            self.update_income_rate(user_id)
+        logger.info(f"Updated the income rate of {len(owners)} users after a shop catalog change")
+
+    def collect_income(self, user_id):
+        """Pay out a user's whole coins of accrued passive income and return the amount"""
+        user_data = self.get_user(user_id)
+        now = time.time()
+        accrued = self.accrued_income(user_data, now)
+        income = int(accrued)
+        if income > 0:
+            user_data["balance"] += income
+            user_data["total_earned"] += income
+            user_data["pending_income"] = accrued - income  # Keep the fraction of a coin for next time
+            user_data["last_income_collection"] = now
+            self.metrics.mint("income", income)
+            self.mark_dirty(user_id)
+        return income
+
+    # Transaction history
+
+    def add_transaction(self, user_id, transaction):
+        """Record a transaction in a user's recent history and queue the record for saving"""
+        self.get_user(user_id)["transactions"].append(transaction)
+        self.trim_transactions(user_id)
+        self.mark_dirty(user_id)
+
+    def trim_transactions(self, user_id):
+        """Move transactions beyond the recent history limit to the archive"""
+        transactions = self.users[str(user_id)]["transactions"]
+        overflow = len(transactions) - TRANSACTION_HISTORY_SIZE
+        if overflow > 0:
+            self.writer.archive(user_id, transactions[:overflow])
+            del transactions[:overflow]
+
+    async def get_transactions(self, user_id, page, per_page=10):
+        """Get a page of a user's transactions, newest first, and the total page count"""
+        recent = self.get_user(user_id)["transactions"][::-1]
+
+        # Anything still queued for the archive has to be written before it can be read back
+        await self.writer.flush()
+        archived_count = await asyncio.to_thread(self.store.count_transactions, user_id)
+        total_pages = max(1, -(-(len(recent) + archived_count) // per_page))
+
+        start = (page - 1) * per_page
+        transactions = recent[start:start + per_page]
+        if len(transactions) < per_page:
+            transactions += await asyncio.to_thread(
+                self.store.get_transactions,
+                user_id,
+                per_page - len(transactions),
+                max(0, start - len(recent))
+            )
+
+        return transactions, total_pages
+
+    # Guild membership and rankings
+
+    def listen(self, bot):
+        """Keep the guild membership index in step with the bot's guild and member events.
+
+        The listeners are registered on the bot rather than in a cog so that every event is
+        applied once, whichever economy cogs are loaded.
+        """
+        async def index_guilds():
+            for guild in bot.guilds:
+                self.index_guild(guild)
+
+        bot.add_listener(index_guilds, "on_ready")
+        bot.add_listener(self._on_guild_join, "on_guild_join")
+        bot.add_listener(self._on_guild_remove, "on_guild_remove")
+        bot.add_listener(self._on_member_join, "on_member_join")
+        bot.add_listener(self._on_member_remove, "on_member_remove")
+
+    async def _on_guild_join(self, guild):
+        self.index_guild(guild)
+
+    async def _on_guild_remove(self, guild):
+        self.remove_guild(guild.id)
+
+    async def _on_member_join(self, member):
+        self.add_member(member.guild.id, member.id)
+
+    async def _on_member_remove(self, member):
+        self.remove_member(member.guild.id, member.id)
+
+    def index_guild(self, guild):
+        """Record the current member list of a guild"""
+        member_ids = [str(member.id) for member in guild.members]
+        for rankings in self.rankings.values():
+            rankings.set_guild(guild.id, member_ids)
+        self.metrics.guild_supply[guild.id] = sum(self._balance(user_id) for user_id in member_ids)
+
+    def remove_guild(self, guild_id):
+        for rankings in self.rankings.values():
+            rankings.remove_guild(guild_id)
+        self.metrics.guild_supply.pop(guild_id, None)
+
+    def add_member(self, guild_id, user_id):
+        # A guild not indexed yet is indexed in full from its member list on first use
+        if not self.guild_members.has_guild(guild_id):
+            return
+        user_id = str(user_id)
+        if not self.guild_members.is_member(guild_id, user_id):
+            self.metrics.guild_supply[guild_id] += self._balance(user_id)
+        for rankings in self.rankings.values():
+            rankings.add_member(guild_id, user_id)
+
+    def remove_member(self, guild_id, user_id):
+        user_id = str(user_id)
+        if self.guild_members.is_member(guild_id, user_id):
+            self.metrics.guild_supply[guild_id] -= self._balance(user_id)
+        for rankings in self.rankings.values():
+            rankings.remove_member(guild_id, user_id)
+
+    def get_guild_supply(self, guild):
+        """Get the coins held by a guild's members"""
+        if not self.guild_members.has_guild(guild.id):
+            self.index_guild(guild)
+        return self.metrics.guild_supply[guild.id]
+
+    def get_guild_leaderboard(self, guild, category="balance"):
+        """Get a guild's leaderboard for one of the RANKED_FIELDS categories"""
+        # Guilds are indexed on ready; this covers a cog being reloaded afterwards
+        if not self.guild_members.has_guild(guild.id):
+            self.index_guild(guild)
+        return self.rankings[category].guild(guild.id)
+
+    def get_global_leaderboard(self, category="balance"):
+        """Get the leaderboard across every user for one of the RANKED_FIELDS categories"""
+        return self.rankings[category].global_index
+
+    def _balance(self, user_id):
+        user_data = self.users.get(user_id)
+        return user_data["balance"] if user_data else 0
+
+    async def close(self):
+        """Write out anything still pending and close the database"""
+        await self.catalog.close()
+        await self.xp.close()
+        await self.writer.close()
+        self.store.close()
@@ -0,0 +1,246 @@
+import os
+import json
+import sqlite3
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("modubot")
+
+# Storage backend for economy data: "sqlite" (a local database file) or "postgres" (the
+# Supabase database from SUPABASE_URL and SUPABASE_KEY)
+ECONOMY_BACKEND = os.getenv("ECONOMY_BACKEND", "sqlite")
+
+def create_economy_store(db_path, db=None, backend=ECONOMY_BACKEND):
+    """Create the economy store for the configured backend. The postgres backend sends its requests through `db`."""
+    if backend == "postgres":
+        from utils.economy_postgres import PostgresEconomyStore
+        return PostgresEconomyStore(db)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown economy backend {backend!r}, expected 'sqlite' or 'postgres'")
+    return EconomyStore(db_path)
+
+def migrate_from_json(store, json_path):
+    """Import users from a legacy economy JSON file into a store, once.
+
+    Both legacy layouts are understood: the flat `{user_id: data}` file written by the
+    slash command cog and the `{"users": {user_id: data}}` file written by the prefix
+    cog, as well as a file both cogs wrote to, which has both. The slash command cog was
+    the one loaded, so its entry wins for a user in both. Returns the number of users
+    imported.
+    """
+    if store.get_meta("json_migrated") or not os.path.exists(json_path):
+        return 0
+
+    with open(json_path, "r") as f:
+        legacy = json.load(f)
+
+    legacy = legacy if isinstance(legacy, dict) else {}
+    nested = legacy.get("users") if isinstance(legacy.get("users"), dict) else {}
+    users = {user_id: data for user_id, data in nested.items() if isinstance(data, dict)}
+    users.update((user_id, data) for user_id, data in legacy.items() if user_id != "users" and isinstance(data, dict))
+
+    store.save_users(users, meta={"json_migrated": json_path})
+    logger.info(f"Migrated {len(users)} economy users from {json_path}")
+    return len(users)
+
+def snapshot_record(record):
+    """Copy a user record deeply enough to serialize it while the original keeps changing"""
+    return {
+        key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+        for key, value in record.items()
+    }
+
+class EconomyStore:
+    """SQLite storage for economy user records.
+
+    Each user is one row, so a balance change rewrites only that user's record. The
+    database runs in WAL mode, which keeps readers and the writer from blocking each
+    other and makes every write an atomic transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                balance INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS users_balance ON users (balance);
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS transactions_user ON transactions (user_id, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+
+    def setup(self):
+        """Nothing to do; the tables are created when the file is opened"""
+
+    def load_all(self):
+        """Load every user record into a dict keyed by user ID"""
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM users").fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def get_user(self, user_id):
+        """Load a single user record, or None if the user has no economy data"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM users WHERE user_id = ?", (str(user_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_user(self, user_id, data):
+        """Insert or update a single user record"""
+        self.save_users({user_id: data})
+
+    def save_users(self, users, archived=(), meta=None):
+        """Insert or update several user records in one transaction.
+
+        `archived` is a list of (user_id, transaction) pairs to append to the transaction
+        archive in the same transaction, so entries trimmed from a user's recent history
+        are never lost or duplicated. `meta` is a dict of meta values saved alongside.
+        """
+        rows = [
+            (str(user_id), int(data.get("balance", 0)), json.dumps(data, separators=(",", ":")))
+            for user_id, data in users.items()
+        ]
+        archive_rows = [
+            (str(user_id), json.dumps(transaction, separators=(",", ":")))
+            for user_id, transaction in archived
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO users (user_id, balance, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET balance = excluded.balance, data = excluded.data",
+                rows
+            )
+            self._conn.executemany("INSERT INTO transactions (user_id, data) VALUES (?, ?)", archive_rows)
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                list((meta or {}).items())
+            )
+
+    def get_transactions(self, user_id, limit=10, offset=0):
+        """Read a page of a user's archived transactions, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM transactions WHERE user_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (str(user_id), limit, offset)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def count_transactions(self, user_id):
+        """Get the number of archived transactions for a user"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (str(user_id),)).fetchone()[0]
+
+    def delete_user(self, user_id):
+        """Remove a user's economy record"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users WHERE user_id = ?", (str(user_id),))
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EconomyWriter:
+    """Coalesces economy changes and writes them to an EconomyStore off the event loop.
+
+    Commands only mark users as dirty. Every `flush_interval` seconds the dirty records
+    are copied on the event loop, then serialized and written in one transaction from a
+    worker thread, so a burst of commands for the same user costs a single write.
+    Transactions trimmed from users' recent history are queued with `archive` and
+    appended to the archive table in that same write, as are the meta values returned
+    by `get_meta`.
+    """
+
+    def __init__(self, store, get_user, flush_interval=5.0, get_meta=None):
+        self.store = store
+        self.get_user = get_user  # Callable returning the live record for a user ID
+        self.get_meta = get_meta  # Optional callable returning {key: value} to save with each flush
+        self.flush_interval = flush_interval
+        self._dirty = set()
+        self._archived = []  # Format: [(user_id, transaction), ...]
+        self._flush_lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def mark_dirty(self, *user_ids):
+        """Schedule the given users to be written with the next flush"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+        self._dirty.update(str(user_id) for user_id in user_ids)
+
+    def archive(self, user_id, transactions):
+        """Queue transactions to be moved to the archive with the next flush"""
+        self._archived.extend((str(user_id), transaction) for transaction in transactions)
+        self.mark_dirty(user_id)
+
+    async def flush(self):
+        """Write every dirty user record to the store"""
+        async with self._flush_lock:
+            if not self._dirty and not self._archived:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            archived, self._archived = self._archived, []
+
+            # Copy records here so commands can keep mutating them while the thread writes
+            snapshot = {}
+            for user_id in dirty:
+                record = self.get_user(user_id)
+                if record is not None:
+                    snapshot[user_id] = snapshot_record(record)
+
+            meta = self.get_meta() if self.get_meta else None
+            try:
+                await asyncio.to_thread(self.store.save_users, snapshot, archived, meta)
+            except Exception as e:
+                logger.error(f"Error saving economy data for {len(snapshot)} users: {e}")
+                self._dirty.update(dirty)
+                self._archived[:0] = archived
+
+    async def close(self):
+        """Stop the background writer and flush any remaining changes"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
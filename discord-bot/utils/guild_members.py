@@ -0,0 +1,55 @@
+class GuildMemberIndex:
+    """Two-way index of which users are members of which guilds.
+
+    Fed from member and guild join/remove events, so guild-scoped economy queries can
+    intersect against a guild's member set instead of asking Discord about every user.
+    """
+
+    def __init__(self):
+        self._members = {}  # Format: {guild_id: {user_id, ...}}
+        self._guilds = {}  # Format: {user_id: {guild_id, ...}}
+
+    def set_guild(self, guild_id, member_ids):
+        """Replace the member set of a guild"""
+        self.remove_guild(guild_id)
+        self._members[guild_id] = set()
+        for user_id in member_ids:
+            self.add_member(guild_id, user_id)
+
+    def remove_guild(self, guild_id):
+        """Forget a guild and all of its memberships"""
+        for user_id in self._members.pop(guild_id, ()):
+            self._forget_membership(guild_id, user_id)
+
+    def add_member(self, guild_id, user_id):
+        """Record a user joining a guild"""
+        self._members.setdefault(guild_id, set()).add(user_id)
+        self._guilds.setdefault(user_id, set()).add(guild_id)
+
+    def remove_member(self, guild_id, user_id):
+        """Record a user leaving a guild"""
+        members = self._members.get(guild_id)
+        if members is not None:
+            members.discard(user_id)
+        self._forget_membership(guild_id, user_id)
+
+    def has_guild(self, guild_id):
+        return guild_id in self._members
+
+    def members(self, guild_id):
+        """Get the set of user IDs in a guild (empty if the guild isn't indexed)"""
+        return self._members.get(guild_id, set())
+
+    def guilds_of(self, user_id):
+        """Get the set of guild IDs a user is a member of"""
+        return self._guilds.get(user_id, set())
+
+    def is_member(self, guild_id, user_id):
+        return user_id in self._members.get(guild_id, ())
+
+    def _forget_membership(self, guild_id, user_id):
+        guilds = self._guilds.get(user_id)
+        if guilds is not None:
+            guilds.discard(guild_id)
+            if not guilds:
+                del self._guilds[user_id]
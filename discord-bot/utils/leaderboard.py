@@ -0,0 +1,118 @@
+from sortedcontainers import SortedList
+
+class LeaderboardIndex:
+    """Scores kept in sorted order for O(log n) updates, top-K and rank lookups"""
+
+    def __init__(self):
+        self._entries = SortedList()  # Sorted (-score, user_id) pairs, highest score first
+        self._scores = {}  # Format: {user_id: score}
+
+    def update(self, user_id, score):
+        """Insert a user or move them to their new score"""
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+        if old_score is not None:
+            self._entries.remove((-old_score, user_id))
+        self._scores[user_id] = score
+        self._entries.add((-score, user_id))
+
+    def remove(self, user_id):
+        """Remove a user from the index"""
+        old_score = self._scores.pop(user_id, None)
+        if old_score is not None:
+            self._entries.remove((-old_score, user_id))
+
+    def top(self, count=10, offset=0):
+        """Get up to `count` (user_id, score) pairs, highest score first"""
+        return [(user_id, -score) for score, user_id in self._entries.islice(offset, offset + count)]
+
+    def rank(self, user_id):
+        """Get a user's 1-based position, or None if they aren't in the index"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._entries.index((-score, user_id)) + 1
+
+    def score(self, user_id):
+        return self._scores.get(user_id)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class GuildLeaderboards:
+    """A global leaderboard plus one leaderboard per guild, kept in sync on every update.
+
+    Guild membership comes from a GuildMemberIndex. A guild's leaderboard is built on
+    first use by intersecting its member set with the scored users, and is then kept up
+    to date through score updates and the membership methods below.
+    """
+
+    def __init__(self, members):
+        self.members = members  # GuildMemberIndex
+        self.global_index = LeaderboardIndex()
+        self._guilds = {}  # Format: {guild_id: LeaderboardIndex}
+
+    def update(self, user_id, score):
+        """Record a user's new score in the global and guild leaderboards"""
+        self.global_index.update(user_id, score)
+        for guild_id in self.members.guilds_of(user_id):
+            index = self._guilds.get(guild_id)
+            if index is not None:
+                index.update(user_id, score)
+
+    def remove_user(self, user_id):
+        """Remove a user from every leaderboard"""
+        self.global_index.remove(user_id)
+        for guild_id in self.members.guilds_of(user_id):
+            index = self._guilds.get(guild_id)
+            if index is not None:
+                index.remove(user_id)
+
+    def guild(self, guild_id):
+        """Get a guild's leaderboard, building it from the member index if needed"""
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = LeaderboardIndex()
+            member_ids = self.members.members(guild_id)
+
+            # Walk whichever side is smaller: the guild's members or the scored users
+            if len(member_ids) <= len(self.global_index):
+                candidates = member_ids
+            else:
+                candidates = [user_id for user_id, _ in self.global_index.top(len(self.global_index))]
+
+            for user_id in candidates:
+                score = self.global_index.score(user_id)
+                if score is not None and user_id in member_ids:
+                    index.update(user_id, score)
+        return index
+
+    def set_guild(self, guild_id, member_ids):
+        """Replace a guild's member list, rebuilding its leaderboard on next use"""
+        self.members.set_guild(guild_id, member_ids)
+        self._guilds.pop(guild_id, None)
+
+    def remove_guild(self, guild_id):
+        """Forget a guild and drop its leaderboard"""
+        self.members.remove_guild(guild_id)
+        self._guilds.pop(guild_id, None)
+
+    def add_member(self, guild_id, user_id):
+        """Record a user joining a guild"""
+        self.members.add_member(guild_id, user_id)
+        index = self._guilds.get(guild_id)
+        score = self.global_index.score(user_id)
+        if index is not None and score is not None:
+            index.update(user_id, score)
+
+    def remove_member(self, guild_id, user_id):
+        """Record a user leaving a guild"""
+        self.members.remove_member(guild_id, user_id)
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(user_id)
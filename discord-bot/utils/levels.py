@@ -0,0 +1,152 @@
+import os
+import time
+import bisect
+import random
+import asyncio
+import logging
+from collections import Counter
+
+logger = logging.getLogger("modubot")
+
+# XP awarded for a message, picked uniformly from this range
+XP_PER_MESSAGE = (15, 25)
+
+# Seconds a user has to wait after earning XP before their messages earn more
+XP_COOLDOWN = float(os.getenv("XP_COOLDOWN", 60))
+
+# Seconds between applying pending XP to the economy records
+XP_FLUSH_INTERVAL = float(os.getenv("XP_FLUSH_INTERVAL", 10))
+
+MAX_LEVEL = 500
+
+def xp_to_next_level(level):
+    """XP needed to go from `level` to `level + 1`"""
+    return 5 * level * level + 50 * level + 100
+
+# LEVEL_THRESHOLDS[n] is the total XP needed to reach level n, computed once at import
+LEVEL_THRESHOLDS = [0]
+for _level in range(MAX_LEVEL):
+    LEVEL_THRESHOLDS.append(LEVEL_THRESHOLDS[-1] + xp_to_next_level(_level))
+del _level
+
+def level_for_xp(xp):
+    """Get the level a total amount of XP reaches, by binary search of the threshold table"""
+    return bisect.bisect_right(LEVEL_THRESHOLDS, xp) - 1
+
+def level_progress(xp):
+    """Get (level, xp into the level, xp the level needs), with 0 needed at MAX_LEVEL"""
+    level = level_for_xp(xp)
+    if level >= MAX_LEVEL:
+        return level, xp - LEVEL_THRESHOLDS[MAX_LEVEL], 0
+    return level, xp - LEVEL_THRESHOLDS[level], LEVEL_THRESHOLDS[level + 1] - LEVEL_THRESHOLDS[level]
+
+
+class XpTracker:
+    """Awards message XP in memory and periodically applies it to the economy as one batch.
+
+    A message earns XP only if its author is off cooldown, and the award is a dict
+    update with no ranking or database work. Every `flush_interval` seconds the pending
+    totals are added to the user records, each user is re-ranked once and the records
+    are handed to the economy writer, so the write rate is bounded by the number of
+    active users per interval however many messages they send.
+
+    Everyone earns XP. A user without an economy record gets an XP-only record instead,
+    which holds no balance and isn't ranked, so chatting doesn't mint a starting balance
+    or put non-players on leaderboards; its XP moves to their economy record once they
+    have one. Each flush passes the level-ups to the listeners added with `on_level_up`.
+    """
+
+    def __init__(self, economy, cooldown=XP_COOLDOWN, flush_interval=XP_FLUSH_INTERVAL):
+        self.economy = economy
+        self.cooldown = cooldown
+        self.flush_interval = flush_interval
+        self._pending = Counter()  # Format: {user_id: xp not yet applied}
+        self._channels = {}  # Format: {user_id: channel of the last message with pending xp}
+        self._last_award = {}  # Format: {user_id: time of the last award}
+        self._listeners = []
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def on_level_up(self, listener):
+        """Call `await listener(level_ups)` after each flush that has level-ups, with {user_id: (new_level, channel_id)}"""
+        self._listeners.append(listener)
+
+    def remove_level_up_listener(self, listener):
+        """Stop calling a listener added with `on_level_up`"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def award_message(self, user_id, channel_id=None, now=None):
+        """Award XP for a message if the user is off cooldown. Returns the XP awarded."""
+        now = time.time() if now is None else now
+        user_id = str(user_id)
+        # Records created before the stored ones are loaded would be saved over them
+        if not self.economy.loaded or now - self._last_award.get(user_id, 0) < self.cooldown:
+            return 0
+
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+        amount = random.randint(*XP_PER_MESSAGE)
+        self._last_award[user_id] = now
+        self._pending[user_id] += amount
+        if channel_id is not None:
+            self._channels[user_id] = channel_id
+        return amount
+
+    def pending(self, user_id):
+        """Get the XP a user has earned that is not yet in their record"""
+        return self._pending.get(str(user_id), 0)
+
+    def get_xp(self, user_id):
+        """Get a user's total XP, including XP not yet applied"""
+        user_id = str(user_id)
+        user_data = self.economy.users.get(user_id) or self.economy.xp_only.get(user_id)
+        return (user_data.get("xp", 0) if user_data else 0) + self.pending(user_id)
+
+    def flush(self):
+        """Apply all pending XP to the user records. Returns {user_id: (new_level, channel_id)} for level-ups."""
+        if not self._pending:
+            return {}
+
+        pending, self._pending = self._pending, Counter()
+        channels, self._channels = self._channels, {}
+        level_ups = {}
+        for user_id, amount in pending.items():
+            user_data = self.economy.get_xp_record(user_id)
+            old_level = level_for_xp(user_data.get("xp", 0))
+            user_data["xp"] = user_data.get("xp", 0) + amount
+            new_level = level_for_xp(user_data["xp"])
+            if new_level > old_level:
+                level_ups[user_id] = (new_level, channels.get(user_id))
+        self.economy.mark_dirty(*pending)
+
+        # Cooldowns that have run out carry no information, so drop them to keep the map small
+        cutoff = time.time() - self.cooldown
+        self._last_award = {user_id: at for user_id, at in self._last_award.items() if at > cutoff}
+        return level_ups
+
+    async def close(self):
+        """Stop the background flush and apply the remaining XP"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        self.flush()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                level_ups = self.flush()
+                if level_ups:
+                    logger.info(f"{len(level_ups)} users levelled up")
+                    await self._announce(level_ups)
+
+    async def _announce(self, level_ups):
+        results = await asyncio.gather(*(listener(level_ups) for listener in self._listeners), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error announcing level-ups: {result}")
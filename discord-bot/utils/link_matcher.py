@@ -0,0 +1,190 @@
+import re
+import unicodedata
+from collections import deque
+
+# Characters that can't be part of a link, so a message is split into candidate links on them.
+# Each piece is then parsed by hand: a nested pattern matching hosts directly backtracks
+# quadratically on input like "a.a.a.a..." and would stall the event loop.
+LINK_SEPARATORS = re.compile(r"[\s<>()\[\]{}\"'`|]+")
+HOST_CHARACTERS = re.compile(r"[\w.-]+")
+
+# Markdown and punctuation around a link rather than part of it
+LINK_EDGE_CHARACTERS = "*_~.,;:!?"
+
+def strip_format_characters(text):
+    """Remove invisible format characters (zero-width spaces and joiners, direction marks, ...)
+
+    They render as nothing, so "evil\u200b.com" looks like evil.com to a reader but would
+    slip past a plain comparison.
+    """
+    if text.isascii():
+        return text
+    return "".join(char for char in text if unicodedata.category(char) != "Cf")
+
+def parse_link(token):
+    """Split a piece of text into (lowercase host, path), or None if it doesn't look like a link.
+
+    The scheme, user info and port are dropped; the path keeps its case and its query, and
+    starts with "/" so that "example.com?x" and "example.com/?x" look the same.
+    """
+    token = strip_format_characters(token).strip(LINK_EDGE_CHARACTERS)
+    scheme_end = token.find("://")
+    if scheme_end != -1:
+        token = token[scheme_end + 3:]
+
+    path_start = min((index for index in (token.find(char) for char in "/?#") if index != -1), default=len(token))
+    host, path = token[:path_start], token[path_start:]
+    host = host.rpartition("@")[2].partition(":")[0].lower().strip(".")
+
+    # A host needs a dot and a top-level label of two or more characters
+    if "." not in host or len(host.rpartition(".")[2]) < 2 or not HOST_CHARACTERS.fullmatch(host):
+        return None
+    if path and not path.startswith("/"):
+        path = "/" + path
+    return host, path
+
+def extract_links(content):
+    """Get (host, path) for every link in a message, with or without a scheme, in one linear pass"""
+    for token in LINK_SEPARATORS.split(content):
+        if "." in token:
+            link = parse_link(token)
+            if link is not None:
+                yield link
+
+def normalize_link(link):
+    """Reduce a banned link to "host" or "host/path": lowercase host, no scheme, www, port or trailing slash"""
+    parsed = next(extract_links(link), None)
+    if parsed is None:
+        return None
+    host, path = parsed
+    if host.startswith("www."):
+        host = host[4:]
+    return host + path.rstrip("/")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds the first of many patterns in a text in one pass"""
+
+    def __init__(self):
+        self._goto = [{}]  # Format: [{char: next_state}], one dict per state
+        self._fail = [0]
+        self._output = [None]  # Format: [value of the pattern the state completes, or None]
+
+    def add(self, pattern, value):
+        """Add a pattern, reported as `value` when found. Call `build` once every pattern is added."""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            state = next_state
+        self._output[state] = value
+
+    def build(self):
+        # Breadth first, so every state's failure target is already complete when it is reached
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Get the value of the first pattern that ends in `text`, or None"""
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state] is not None:
+                return self._output[state]
+        return None
+
+
+class LinkMatcher:
+    """Matches the links in a message against a set of banned domains and URLs in one pass.
+
+    Banned entries are normalized and compiled into an Aho-Corasick automaton. To check
+    a message, every link in it is reduced to ".host/path " and the links are joined
+    into one string, which the automaton scans once however many entries there are.
+    A domain entry is compiled as ".domain " and ".domain/", so it matches the domain
+    and its subdomains but not other domains ending in the same letters; an entry with
+    a path matches links that start with it.
+
+    Entries that aren't links (e.g. "badword") are matched anywhere in the message,
+    ignoring case, by a second automaton.
+    """
+
+    def __init__(self, banned_links):
+        self.links = set()
+        self.words = set()
+        for entry in banned_links:
+            link = normalize_link(entry)
+            if link:
+                self.links.add(link)
+                continue
+            word = strip_format_characters(str(entry)).strip().lower()
+            if word:
+                self.words.add(word)
+
+        self._links = KeywordAutomaton()
+        for link in self.links:
+            if "/" in link:
+                self._links.add(f".{link}", link)
+            else:
+                self._links.add(f".{link} ", link)
+                self._links.add(f".{link}/", link)
+        self._links.build()
+
+        self._words = KeywordAutomaton()
+        for word in self.words:
+            self._words.add(word, word)
+        self._words.build()
+
+    def find(self, content):
+        """Get the first banned link or word found in a message, or None"""
+        if self.words:
+            word = self._words.find(strip_format_characters(content).lower())
+            if word is not None:
+                return word
+
+        if not self.links:
+            return None
+        links = [f".{host}{path} " for host, path in extract_links(content)]
+        if not links:
+            return None
+        return self._links.find("".join(links))
+
+    def __len__(self):
+        return len(self.links) + len(self.words)
+
+
+class GuildLinkMatchers:
+    """Compiled LinkMatchers per guild, rebuilt only when a guild's banned links change"""
+
+    def __init__(self):
+        self._matchers = {}  # Format: {guild_id: (banned_links, LinkMatcher)}
+
+    def get(self, guild_id, banned_links):
+        cached = self._matchers.get(guild_id)
+        # The settings cache hands back the same list until it refreshes, and a refreshed
+        # list usually has the same contents, so compare cheaply before recompiling
+        if cached is not None and cached[0] is banned_links:
+            return cached[1]
+        if cached is None or cached[0] != banned_links:
+            cached = (banned_links, LinkMatcher(banned_links))
+        else:
+            # Same contents: keep the matcher, but remember the new list so later calls
+            # take the identity check above instead of comparing again
+            cached = (banned_links, cached[1])
+        self._matchers[guild_id] = cached
+        return cached[1]
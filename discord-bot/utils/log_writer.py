@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("modubot")
+
+class ModerationLogWriter:
+    """Buffers moderation log entries and writes them to the database as multi-row inserts.
+
+    Entries are flushed once `batch_size` of them are waiting or `flush_interval` seconds
+    have passed, whichever comes first. The buffer holds at most `max_pending` entries;
+    once it is full, `add` waits for the next flush instead of growing without bound.
+
+    Entries from a failed write are kept and retried first on the next flush, with the
+    interval between flushes doubling (up to `max_retry_delay`) while writes keep
+    failing. At most `max_pending` of them are kept; beyond that the oldest are dropped.
+    """
+
+    def __init__(self, db, batch_size=50, flush_interval=2.0, max_pending=1000, max_retry_delay=60.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retry_delay = max_retry_delay
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._failed = []  # Format: [entry, ...], entries whose write failed, oldest first
+        self._failures = 0  # Flushes failed in a row
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._closing = False
+
+    async def add(self, entry):
+        """Queue a log entry, waiting if the buffer is full"""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+        await self._queue.put(entry)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self):
+        """Write every queued entry to the database"""
+        async with self._flush_lock:
+            # Entries that failed before go first, so the log keeps its order
+            pending, self._failed = self._failed, []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                try:
+                    await self.db.insert_moderation_logs(batch)
+                except Exception as e:
+                    self._failures += 1
+                    unwritten = pending[start:]
+                    self._failed = unwritten[-self.max_pending:]
+                    logger.error(f"Error writing {len(batch)} moderation log entries, {len(self._failed)} kept for retry: {str(e)}")
+                    if len(unwritten) > len(self._failed):
+                        logger.error(f"Dropped {len(unwritten) - len(self._failed)} moderation log entries after repeated write failures")
+                    return
+            self._failures = 0
+
+    async def close(self):
+        """Stop the background writer and flush whatever is still queued"""
+        self._closing = True
+        self._batch_ready.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._failed:
+            logger.error(f"Lost {len(self._failed)} moderation log entries that could not be written before closing")
+
+    async def _run(self):
+        while not self._closing:
+            # Back off while the database keeps failing
+            timeout = min(self.flush_interval * 2 ** min(self._failures, 10), self.max_retry_delay)
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            self._batch_ready.clear()
+            await self.flush()
@@ -0,0 +1,63 @@
+import os
+import logging
+from aiohttp import web
+
+logger = logging.getLogger("modubot")
+
+# Port for the Prometheus metrics endpoint; the endpoint is disabled when unset
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+class MetricsServer:
+    """Serves economy metrics at /metrics in the Prometheus text format"""
+
+    def __init__(self, economy, host=METRICS_HOST, port=METRICS_PORT):
+        self.economy = economy
+        self.host = host
+        self.port = int(port) if port else None
+        self._runner = None
+
+    async def start(self):
+        if self.port is None:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.render(), content_type="text/plain")
+
+    def render(self):
+        metrics = self.economy.metrics
+        today = metrics.day()
+        lines = [
+            "# HELP modubot_economy_supply Coins held by all users",
+            "# TYPE modubot_economy_supply gauge",
+            f"modubot_economy_supply {metrics.supply}",
+            "# HELP modubot_economy_users Users with economy data",
+            "# TYPE modubot_economy_users gauge",
+            f"modubot_economy_users {len(self.economy.users)}",
+            "# HELP modubot_economy_guild_supply Coins held by a guild's members",
+            "# TYPE modubot_economy_guild_supply gauge",
+        ]
+        lines += [f'modubot_economy_guild_supply{{guild="{guild_id}"}} {supply}' for guild_id, supply in metrics.guild_supply.items()]
+
+        for name, counts, help_text in (
+            ("minted", metrics.minted, "Coins created, by source"),
+            ("burned", metrics.burned, "Coins destroyed, by source"),
+        ):
+            lines += [f"# HELP modubot_economy_{name}_total {help_text}", f"# TYPE modubot_economy_{name}_total counter"]
+            lines += [f'modubot_economy_{name}_total{{source="{source}"}} {amount}' for source, amount in counts.items()]
+            lines += [f"# HELP modubot_economy_{name}_today {help_text}, today (UTC)", f"# TYPE modubot_economy_{name}_today gauge"]
+            lines += [f'modubot_economy_{name}_today{{source="{source}"}} {amount}' for source, amount in today[name].items()]
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,142 @@
+import os
+import re
+import time
+from collections import OrderedDict, deque
+
+# A raid is this many joins within RAID_JOIN_WINDOW seconds, at least half of them fresh accounts
+RAID_JOIN_THRESHOLD = int(os.getenv("RAID_JOIN_THRESHOLD", 10))  # Joins
+RAID_JOIN_WINDOW = float(os.getenv("RAID_JOIN_WINDOW", 30))  # Seconds
+
+# Accounts younger than this many seconds are fresh
+RAID_ACCOUNT_AGE = float(os.getenv("RAID_ACCOUNT_AGE", 7 * 24 * 3600))
+
+# ...or this many fresh accounts posting the same message within RAID_JOIN_WINDOW seconds
+RAID_DUPLICATE_THRESHOLD = int(os.getenv("RAID_DUPLICATE_THRESHOLD", 4))
+
+# Messages shorter than this after normalizing ("hi!", "lol") are too common to signal a raid
+RAID_MIN_MESSAGE_LENGTH = 20
+
+# Seconds raid mode stays on after the last sign of the raid
+RAID_MODE_DURATION = float(os.getenv("RAID_MODE_DURATION", 300))
+
+# Most distinct messages remembered per guild
+RAID_MAX_FINGERPRINTS = 256
+
+# Suspects banned per request (Discord's bulk ban limit), seconds between bulk bans during a
+# raid, and seconds of each suspect's messages deleted with the ban
+RAID_BAN_BATCH_SIZE = 200
+RAID_BAN_INTERVAL = 5
+RAID_DELETE_MESSAGE_SECONDS = 3600
+
+# Mentions and numbers vary between copies of a raid message, so they're left out of its fingerprint
+FINGERPRINT_NOISE = re.compile(r"<[@#][!&]?\d+>|\d+")
+
+def message_fingerprint(content):
+    """Reduce a message to the text that copies of it share, or "" if nothing is left"""
+    return " ".join(FINGERPRINT_NOISE.sub(" ", content.lower()).split())
+
+
+class GuildRaidState:
+    __slots__ = ("joins", "messages", "raid_until", "suspects")
+
+    def __init__(self):
+        self.joins = deque()  # Format: deque of (time, user_id, fresh)
+        self.messages = OrderedDict()  # Format: {fingerprint: {user_id: time}}, least recently posted first
+        self.raid_until = 0
+        self.suspects = set()
+
+
+class RaidDetector:
+    """Detects join raids per guild from join rate, account age and repeated messages.
+
+    A guild enters raid mode when a burst of joins is mostly fresh accounts, or when
+    several fresh accounts post the same message of at least RAID_MIN_MESSAGE_LENGTH
+    characters. While it lasts, fresh accounts that join or repeat such a message are
+    collected as suspects for the caller to act on in bulk with `take_suspects`. Raid
+    mode ends RAID_MODE_DURATION seconds after the last join or message that looked like
+    part of the raid.
+
+    Only messages from fresh accounts need to be passed to `message_sent`, which keeps
+    the per-message cost to established members at nothing.
+    """
+
+    def __init__(self):
+        self._guilds = {}  # Format: {guild_id: GuildRaidState}
+
+    def member_joined(self, guild_id, user_id, fresh, now=None):
+        """Record a join. Returns whether the guild is in raid mode."""
+        now = time.monotonic() if now is None else now
+        state = self._guilds.setdefault(guild_id, GuildRaidState())
+
+        joins = state.joins
+        while joins and now - joins[0][0] > RAID_JOIN_WINDOW:
+            joins.popleft()
+        joins.append((now, user_id, fresh))
+
+        if state.raid_until > now:
+            if fresh:
+                state.suspects.add(user_id)
+                state.raid_until = now + RAID_MODE_DURATION
+            return True
+
+        fresh_joins = [joined_id for _, joined_id, joined_fresh in joins if joined_fresh]
+        if len(joins) >= RAID_JOIN_THRESHOLD and len(fresh_joins) * 2 >= len(joins):
+            self._start(state, fresh_joins, now)
+            return True
+        return False
+
+    def message_sent(self, guild_id, user_id, content, now=None):
+        """Record a message from a fresh account. Returns whether the guild is in raid mode."""
+        now = time.monotonic() if now is None else now
+        fingerprint = message_fingerprint(content)
+        if len(fingerprint) < RAID_MIN_MESSAGE_LENGTH:
+            return self.in_raid(guild_id, now)
+
+        state = self._guilds.setdefault(guild_id, GuildRaidState())
+        raiding = state.raid_until > now
+
+        posters = state.messages.pop(fingerprint, None) or {}
+        state.messages[fingerprint] = posters
+        while len(state.messages) > RAID_MAX_FINGERPRINTS:
+            state.messages.popitem(last=False)
+
+        for poster_id in [poster_id for poster_id, posted in posters.items() if now - posted > RAID_JOIN_WINDOW]:
+            del posters[poster_id]
+        posters[user_id] = now
+
+        # Once a raid is on, one repeat of another fresh member's message is enough
+        if len(posters) >= (2 if raiding else RAID_DUPLICATE_THRESHOLD):
+            if raiding:
+                state.suspects.update(posters)
+                state.raid_until = now + RAID_MODE_DURATION
+            else:
+                self._start(state, posters, now)
+            return True
+        return raiding
+
+    def add_suspect(self, guild_id, user_id, now=None):
+        """Collect a member caught misbehaving during a raid. Returns False if the guild isn't in raid mode."""
+        if not self.in_raid(guild_id, now):
+            return False
+        self._guilds[guild_id].suspects.add(user_id)
+        return True
+
+    def in_raid(self, guild_id, now=None):
+        now = time.monotonic() if now is None else now
+        state = self._guilds.get(guild_id)
+        return state is not None and state.raid_until > now
+
+    def take_suspects(self, guild_id):
+        """Get and forget the suspects collected in a guild since the last call"""
+        state = self._guilds.get(guild_id)
+        if state is None or not state.suspects:
+            return []
+        suspects, state.suspects = list(state.suspects), set()
+        return suspects
+
+    def _start(self, state, suspects, now):
+        state.raid_until = now + RAID_MODE_DURATION
+        state.suspects.update(suspects)
+        # Start counting afresh so the raid that is already being handled doesn't start another
+        state.joins.clear()
+        state.messages.clear()
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import heapq
+import sqlite3
+import asyncio
+import logging
+import threading
+
+import discord
+
+logger = logging.getLogger("modubot")
+
+# File the pending actions are kept in, so they survive a restart
+SCHEDULER_DB_FILE = os.getenv("SCHEDULER_DB_FILE", "data/scheduler.db")
+
+# Most actions fired at once; the rest follow straight after
+SCHEDULER_BATCH_SIZE = 100
+
+# Seconds to hold back an action whose handler raised an error (e.g. a failed API request)
+# before trying it again; the delay doubles with each failure, up to SCHEDULER_MAX_RETRY_DELAY
+SCHEDULER_RETRY_DELAY = 60
+SCHEDULER_MAX_RETRY_DELAY = 3600
+
+# Failed runs after which an action is given up on
+SCHEDULER_MAX_ATTEMPTS = 6
+
+class ActionStore:
+    """SQLite storage for scheduled actions, one row per (action, guild, target)"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scheduled_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                due REAL NOT NULL,
+                action TEXT NOT NULL,
+                guild_id TEXT NOT NULL,
+                target_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                UNIQUE (action, guild_id, target_id)
+            );
+        """)
+        self._conn.commit()
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, due, action, guild_id, target_id, data FROM scheduled_actions"
+            ).fetchall()
+        return [
+            {"id": action_id, "due": due, "action": action, "guild_id": guild_id, "target_id": target_id, "data": json.loads(data)}
+            for action_id, due, action, guild_id, target_id, data in rows
+        ]
+
+    def upsert(self, due, action, guild_id, target_id, data):
+        """Save an action, replacing a pending one with the same key. Returns its row ID."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO scheduled_actions (due, action, guild_id, target_id, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(action, guild_id, target_id) DO UPDATE SET due = excluded.due, data = excluded.data",
+                (due, action, guild_id, target_id, json.dumps(data))
+            )
+            return self._conn.execute(
+                "SELECT id FROM scheduled_actions WHERE action = ? AND guild_id = ? AND target_id = ?",
+                (action, guild_id, target_id)
+            ).fetchone()[0]
+
+    def set_due(self, dues):
+        """Move actions to new due times, given as [(due, id)]"""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE scheduled_actions SET due = ? WHERE id = ?", dues)
+
+    def delete(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM scheduled_actions WHERE id = ?", [(action_id,) for action_id in ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Scheduler:
+    """Runs timed actions such as unmutes from one task, persisted across restarts.
+
+    Pending actions sit in a heap ordered by due time and one task sleeps until the
+    earliest of them, so any number of pending actions costs a single timer. Everything
+    that is due when the task wakes is fired together, up to SCHEDULER_BATCH_SIZE at a
+    time, and removed from storage in one write.
+
+    Each action is identified by (action, guild_id, target_id); scheduling it again
+    moves the existing entry and `cancel` removes it. Handlers are registered per action
+    name with `register` and called as `await handler(guild_id, target_id, data)`.
+    """
+
+    def __init__(self, path=SCHEDULER_DB_FILE):
+        self.store = ActionStore(path)
+        self._handlers = {}  # Format: {action: coroutine function}
+        self._heap = []  # Format: [(due, id)], may hold stale entries for moved or cancelled actions
+        self._pending = {}  # Format: {id: action dict}
+        self._ids = {}  # Format: {(action, guild_id, target_id): id}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    def register(self, action, handler):
+        """Set the coroutine function that performs an action when it is due"""
+        self._handlers[action] = handler
+
+    def start(self):
+        """Load the pending actions from storage and start firing them"""
+        if self._task is not None and not self._task.done():
+            return
+
+        for entry in self.store.load_all():
+            self._track(entry)
+        logger.info(f"Scheduler loaded {len(self._pending)} pending actions")
+
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def schedule(self, action, guild_id, target_id, delay, data=None):
+        """Perform `action` for a target in `delay` seconds, replacing any pending one for the same target"""
+        due = time.time() + delay
+        guild_id, target_id = str(guild_id), str(target_id)
+        data = data or {}
+        action_id = await asyncio.to_thread(self.store.upsert, due, action, guild_id, target_id, data)
+        self._track({"id": action_id, "due": due, "action": action, "guild_id": guild_id, "target_id": target_id, "data": data})
+
+        # Wake the task in case this is now the earliest action
+        self._wakeup.set()
+        return due
+
+    async def cancel(self, action, guild_id, target_id):
+        """Drop a pending action. Returns whether there was one."""
+        action_id = self._ids.pop((action, str(guild_id), str(target_id)), None)
+        if action_id is None:
+            return False
+        # The heap entry is skipped when it comes up
+        del self._pending[action_id]
+        await asyncio.to_thread(self.store.delete, [action_id])
+        return True
+
+    def get(self, action, guild_id, target_id):
+        """Get a pending action, or None"""
+        return self._pending.get(self._ids.get((action, str(guild_id), str(target_id))))
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _track(self, entry):
+        key = (entry["action"], entry["guild_id"], entry["target_id"])
+        self._ids[key] = entry["id"]
+        self._pending[entry["id"]] = entry
+        heapq.heappush(self._heap, (entry["due"], entry["id"]))
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < SCHEDULER_BATCH_SIZE:
+            when, action_id = heapq.heappop(self._heap)
+            entry = self._pending.get(action_id)
+            # Skip entries for cancelled actions and for ones moved to a later time
+            if entry is None or entry["due"] != when:
+                continue
+            del self._pending[action_id]
+            del self._ids[(entry["action"], entry["guild_id"], entry["target_id"])]
+            due.append(entry)
+        return due
+
+    async def _run(self):
+        while not self._stopping:
+            # Drop stale heap entries so the sleep is measured against a live action
+            while self._heap and self._pending.get(self._heap[0][1], {}).get("due") != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            timeout = max(0, self._heap[0][0] - time.time()) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            batch = self._pop_due(time.time())
+            if batch:
+                await self._fire(batch)
+
+    async def _fire(self, batch):
+        # Cogs register their handlers before the scheduler starts, so an action without
+        # one belongs to a cog that failed to load and would never run
+        runnable = []
+        done = []
+        for entry in batch:
+            if entry["action"] in self._handlers:
+                runnable.append(entry)
+            else:
+                logger.error(f"No handler for scheduled action {entry['action']!r}, dropping it for {entry['target_id']} in guild {entry['guild_id']}")
+                done.append(entry)
+
+        results = await asyncio.gather(
+            *(self._handlers[entry["action"]](entry["guild_id"], entry["target_id"], entry["data"]) for entry in runnable),
+            return_exceptions=True
+        )
+        deferred = []
+        now = time.time()
+        for entry, result in zip(runnable, results):
+            description = f"scheduled {entry['action']} for {entry['target_id']} in guild {entry['guild_id']}"
+            if not isinstance(result, Exception):
+                done.append(entry)
+            elif entry["id"] in self._pending:
+                # Scheduled again while its handler ran; the new entry replaces this one
+                logger.error(f"Error running {description}: {result}")
+            elif isinstance(result, (discord.Forbidden, discord.NotFound)):
+                # Missing permissions or a deleted role won't fix themselves
+                logger.warning(f"Dropping {description}: {result}")
+                done.append(entry)
+            else:
+                entry["attempts"] = entry.get("attempts", 0) + 1
+                if entry["attempts"] >= SCHEDULER_MAX_ATTEMPTS:
+                    logger.error(f"Giving up on {description} after {entry['attempts']} attempts: {result}")
+                    done.append(entry)
+                    continue
+                delay = min(SCHEDULER_RETRY_DELAY * 2 ** (entry["attempts"] - 1), SCHEDULER_MAX_RETRY_DELAY)
+                logger.error(f"Error running {description}, retrying in {delay}s: {result}")
+                entry["due"] = now + delay
+                self._track(entry)
+                deferred.append(entry)
+
+        try:
+            # An action scheduled again while its handler ran is pending once more and keeps its row
+            await asyncio.to_thread(self.store.delete, [entry["id"] for entry in done if entry["id"] not in self._pending])
+            if deferred:
+                await asyncio.to_thread(self.store.set_due, [(entry["due"], entry["id"]) for entry in deferred])
+        except Exception as e:
+            logger.error(f"Error saving {len(batch)} fired scheduled actions: {e}")
+
+    async def close(self):
+        """Stop firing actions; pending ones stay stored for the next start"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        self.store.close()
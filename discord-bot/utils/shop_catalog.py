@@ -0,0 +1,172 @@
+import os
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger("modubot")
+
+# Data file with every item sold by the economy cogs
+SHOP_CATALOG_FILE = os.getenv("SHOP_CATALOG_FILE", "data/shop.json")
+
+# Seconds between checks of the catalog file for changes
+SHOP_RELOAD_INTERVAL = float(os.getenv("SHOP_RELOAD_INTERVAL", 30))
+
+ITEM_TYPES = ("role", "consumable", "passive_income")
+
+# Price bands as (name, lowest price, lowest price of the next band)
+PRICE_BANDS = [
+    ("budget", 0, 2500),
+    ("standard", 2500, 15000),
+    ("premium", 15000, None)
+]
+
+def price_band(price):
+    """Get the name of the band a price falls in"""
+    for name, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return name
+    return PRICE_BANDS[0][0]
+
+def item_income_rate(item, period=3600):
+    """Get how much an item generates per `period` seconds, or 0 if it isn't a passive income item"""
+    if not item or item["type"] != "passive_income":
+        return 0
+    return item["income_rate"] * period / item.get("income_period", period)
+
+
+class ShopCatalog:
+    """The shop items, loaded from a data file and indexed by ID, type and price band.
+
+    The file is checked for changes every `reload_interval` seconds and reloaded in
+    place, so prices and items can change without a restart. A file that fails to
+    parse or validate is logged and the previous catalog stays in use. Anything derived
+    from the catalog, such as a shop embed, can be kept with `view`, which rebuilds it
+    only after the catalog changes.
+    """
+
+    def __init__(self, path=SHOP_CATALOG_FILE, reload_interval=SHOP_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.version = 0
+        self._items = {}  # Format: {item_id: item}, cheapest first
+        self._by_type = {}  # Format: {type: [item, ...]}, cheapest first
+        self._by_band = {}  # Format: {band: [item, ...]}, cheapest first
+        self._views = {}  # Format: {key: (version, value)}
+        self._listeners = []
+        self._mtime = None
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def load(self):
+        """Read the catalog file and rebuild the indexes. Returns whether the catalog changed."""
+        try:
+            self._mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = self._validate(json.load(f).get("items", []))
+        except Exception as e:
+            logger.error(f"Error loading shop catalog {self.path}: {e}")
+            return False
+
+        old_items = self._items
+        self._items = {item["id"]: item for item in sorted(items, key=lambda item: item["price"])}
+        self._by_type = {}
+        self._by_band = {}
+        for item in self._items.values():
+            self._by_type.setdefault(item["type"], []).append(item)
+            self._by_band.setdefault(price_band(item["price"]), []).append(item)
+        self.version += 1
+        logger.info(f"Loaded {len(self._items)} shop items from {self.path}")
+
+        for listener in self._listeners:
+            try:
+                listener(old_items)
+            except Exception as e:
+                logger.error(f"Error applying shop catalog change: {e}")
+        return True
+
+    def _validate(self, items):
+        seen = set()
+        for item in items:
+            for field in ("id", "name", "price", "description", "type"):
+                if field not in item:
+                    raise ValueError(f"item {item.get('id', item)!r} is missing {field!r}")
+            if item["type"] not in ITEM_TYPES:
+                raise ValueError(f"item {item['id']!r} has unknown type {item['type']!r}")
+            if item["type"] == "passive_income":
+                if "income_rate" not in item:
+                    raise ValueError(f"passive income item {item['id']!r} has no income_rate")
+                # The shop divides prices by the rate to show payback times, and the rate by its period
+                for field in ("income_rate", "income_period"):
+                    value = item.get(field, 1)
+                    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                        raise ValueError(f"passive income item {item['id']!r} has {field} {value!r}, expected a positive number")
+
+            item["id"] = item["id"].lower()
+            if item["id"] in seen:
+                raise ValueError(f"item {item['id']!r} is listed twice")
+            seen.add(item["id"])
+        return items
+
+    def reload_if_changed(self):
+        """Reload the catalog if its file was modified since the last load"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        return mtime != self._mtime and self.load()
+
+    def on_change(self, listener):
+        """Call `listener(old_items)` after every reload, with the previous {item_id: item}"""
+        self._listeners.append(listener)
+
+    def get(self, item_id):
+        """Get an item by ID, ignoring case, or None if there is no such item"""
+        return self._items.get(str(item_id).lower())
+
+    def items(self):
+        """Get every item, cheapest first"""
+        return list(self._items.values())
+
+    def of_type(self, item_type):
+        """Get the items of one type, cheapest first"""
+        return list(self._by_type.get(item_type, ()))
+
+    def in_band(self, band):
+        """Get the items in one of the PRICE_BANDS, cheapest first"""
+        return list(self._by_band.get(band, ()))
+
+    def income_rate(self, item_id, period=3600):
+        """Get how much an item generates per `period` seconds, or 0 if it isn't a passive income item"""
+        return item_income_rate(self._items.get(item_id), period)
+
+    def view(self, key, build):
+        """Get a value derived from the catalog, calling `build()` only if the catalog changed since it was built"""
+        cached = self._views.get(key)
+        if cached is None or cached[0] != self.version:
+            cached = self._views[key] = (self.version, build())
+        return cached[1]
+
+    def __contains__(self, item_id):
+        return str(item_id).lower() in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def watch(self):
+        """Start checking the catalog file for changes in the background"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.reload_interval)
+            except asyncio.TimeoutError:
+                self.reload_if_changed()
@@ -0,0 +1,161 @@
+"""Slot machine payout engine, with exact odds, a Monte Carlo simulator and a benchmark.
+
+Run `python -m utils.slots` from the bot directory to print the odds of the default
+machine and benchmark both the per-spin path used by /slots and the simulator. The
+simulator needs NumPy (`pip install numpy`); the bot itself does not.
+"""
+import time
+import random
+import argparse
+import itertools
+
+FRUITS = ["🍒", "🍊", "🍋", "🍇", "🍉"]
+
+# Outcome kinds returned by SlotMachine.evaluate
+JACKPOT = "jackpot"
+MIXED_FRUITS = "mixed_fruits"
+MIXED_SYMBOLS = "mixed_symbols"
+NO_WIN = "no_win"
+
+class SlotMachine:
+    """A three reel slot machine configuration and its payout rules.
+
+    Winnings are `bet * multiplier` on top of the returned bet; a spin that pays
+    nothing loses the bet. Rules are checked in order: three of a kind pays that
+    symbol's multiplier, then three fruits, then three different symbols.
+    """
+
+    def __init__(self, symbols, weights, payouts, special_combos, fruits=FRUITS):
+        self.symbols = list(symbols)
+        self.weights = list(weights)
+        self.payouts = dict(payouts)  # Format: {symbol: three_of_a_kind_multiplier}
+        self.special_combos = dict(special_combos)  # Format: {MIXED_FRUITS: multiplier, MIXED_SYMBOLS: multiplier}
+        self.fruits = set(fruits)
+
+    def spin(self, rng=random):
+        """Pick the three reels"""
+        return rng.choices(self.symbols, weights=self.weights, k=3)
+
+    def evaluate(self, reels):
+        """Get the (kind, multiplier) a set of reels pays"""
+        first, second, third = reels
+        if first == second == third:
+            return JACKPOT, self.payouts[first]
+        if all(symbol in self.fruits for symbol in reels):
+            return MIXED_FRUITS, self.special_combos[MIXED_FRUITS]
+        if first != second and second != third and first != third:
+            return MIXED_SYMBOLS, self.special_combos[MIXED_SYMBOLS]
+        return NO_WIN, 0
+
+    def winnings(self, bet, multiplier):
+        """Coins won on top of the bet, rounded down as /slots pays them"""
+        return int(bet * multiplier)
+
+    def net_return(self, multiplier):
+        """Net change in balance per coin bet for a multiplier, ignoring rounding"""
+        return multiplier if multiplier > 0 else -1
+
+    def exact_stats(self):
+        """Expected value, variance and house edge per coin bet, from every possible spin"""
+        total_weight = sum(self.weights)
+        probabilities = {symbol: weight / total_weight for symbol, weight in zip(self.symbols, self.weights)}
+
+        mean = 0.0
+        mean_square = 0.0
+        for reels in itertools.product(self.symbols, repeat=3):
+            probability = probabilities[reels[0]] * probabilities[reels[1]] * probabilities[reels[2]]
+            value = self.net_return(self.evaluate(reels)[1])
+            mean += probability * value
+            mean_square += probability * value * value
+
+        return {"expected_value": mean, "variance": mean_square - mean * mean, "house_edge": -mean}
+
+    def simulate(self, spins=1_000_000, seed=None, chunk_size=1_000_000):
+        """Estimate the exact_stats figures by simulating spins with NumPy, in chunks"""
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        weights = np.asarray(self.weights, dtype=np.float64)
+        probabilities = weights / weights.sum()
+        jackpot = np.asarray([self.payouts[symbol] for symbol in self.symbols], dtype=np.float64)
+        is_fruit = np.asarray([symbol in self.fruits for symbol in self.symbols])
+
+        total = 0.0
+        total_square = 0.0
+        done = 0
+        while done < spins:
+            size = min(chunk_size, spins - done)
+            reels = rng.choice(len(self.symbols), size=(size, 3), p=probabilities)
+            first, second, third = reels[:, 0], reels[:, 1], reels[:, 2]
+
+            three_of_a_kind = (first == second) & (second == third)
+            all_fruits = is_fruit[reels].all(axis=1) & ~three_of_a_kind
+            all_different = (first != second) & (second != third) & (first != third) & ~all_fruits
+
+            multiplier = np.zeros(size)
+            multiplier[three_of_a_kind] = jackpot[first[three_of_a_kind]]
+            multiplier[all_fruits] = self.special_combos[MIXED_FRUITS]
+            multiplier[all_different] = self.special_combos[MIXED_SYMBOLS]
+            net = np.where(multiplier > 0, multiplier, -1.0)
+
+            total += net.sum()
+            total_square += np.square(net).sum()
+            done += size
+
+        mean = total / spins
+        return {"expected_value": mean, "variance": total_square / spins - mean * mean, "house_edge": -mean}
+
+
+DEFAULT_MACHINE = SlotMachine(
+    symbols=["🍒", "🍊", "🍋", "🍇", "🍉", "💎", "7️⃣"],
+    weights=[20, 15, 15, 10, 10, 5, 2],  # Higher weight = more common
+    payouts={
+        "🍒": 1.5,  # Three cherries pays 1.5x
+        "🍊": 2,    # Three oranges pays 2x
+        "🍋": 2,    # Three lemons pays 2x
+        "🍇": 2.5,  # Three grapes pays 2.5x
+        "🍉": 3,    # Three watermelons pays 3x
+        "💎": 5,    # Three diamonds pays 5x
+        "7️⃣": 10   # Three sevens pays 10x
+    },
+    special_combos={
+        MIXED_FRUITS: 1,  # Any 3 fruits pays 1x
+        MIXED_SYMBOLS: 0.5  # Any 3 different symbols pays 0.5x
+    }
+)
+
+def benchmark(machine, spins):
+    """Time the per-spin path used by /slots and the vectorized simulator"""
+    count = min(spins, 200_000)
+    start = time.perf_counter()
+    for _ in range(count):
+        machine.evaluate(machine.spin())
+    elapsed = time.perf_counter() - start
+    print(f"spin + evaluate: {count / elapsed:,.0f} spins/s")
+
+    try:
+        start = time.perf_counter()
+        machine.simulate(spins)
+        elapsed = time.perf_counter() - start
+        print(f"simulate:        {spins / elapsed:,.0f} spins/s")
+    except ImportError:
+        print("simulate:        skipped, NumPy is not installed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot machine odds and benchmark")
+    parser.add_argument("--spins", type=int, default=10_000_000, help="spins to simulate")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for the simulation")
+    args = parser.parse_args()
+
+    exact = DEFAULT_MACHINE.exact_stats()
+    print("exact:     EV {expected_value:+.4f}  variance {variance:.4f}  house edge {house_edge:+.2%}".format(**exact))
+    try:
+        simulated = DEFAULT_MACHINE.simulate(args.spins, args.seed)
+        print("simulated: EV {expected_value:+.4f}  variance {variance:.4f}  house edge {house_edge:+.2%}".format(**simulated))
+    except ImportError:
+        print("simulated: skipped, NumPy is not installed")
+
+    benchmark(DEFAULT_MACHINE, args.spins)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import time
+from collections import deque
+
+# Defaults for guilds that don't set spam_threshold / spam_timeframe in their settings
+DEFAULT_SPAM_THRESHOLD = int(os.getenv("SPAM_THRESHOLD", 5))  # Messages
+DEFAULT_SPAM_TIMEFRAME = float(os.getenv("SPAM_TIMEFRAME", 5))  # Seconds
+
+# Seconds covered by one slot of the eviction wheel, and the number of slots
+SPAM_WHEEL_TICK = 1.0
+SPAM_WHEEL_SLOTS = 64
+
+class SpamDetector:
+    """Sliding-window message rate detection per (guild, user).
+
+    Each key keeps a ring buffer of its last `threshold` message times, so a user is
+    spamming exactly when their buffer is full and its oldest entry is within the
+    window: there are no fixed window boundaries to slip messages across, and a key
+    never holds more than `threshold` timestamps.
+
+    Idle keys are evicted by a timing wheel. A new key is filed in the slot of the tick
+    at which its window ends; when the wheel reaches that slot a key that has seen no
+    message within its window is dropped, and one that is still active is filed again
+    further on. The wheel is advanced by `hit` itself, so memory stays proportional to
+    the users active in the last window (plus one rotation of the wheel at most).
+    """
+
+    def __init__(self, tick=SPAM_WHEEL_TICK, slots=SPAM_WHEEL_SLOTS):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._current_tick = None
+        self._windows = {}  # Format: {(guild_id, user_id): (deque of message times, timeframe)}
+
+    def hit(self, guild_id, user_id, threshold=DEFAULT_SPAM_THRESHOLD, timeframe=DEFAULT_SPAM_TIMEFRAME, now=None):
+        """Record a message. Returns True if it makes `threshold` messages within `timeframe` seconds."""
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+
+        key = (guild_id, user_id)
+        entry = self._windows.get(key)
+        if entry is None or entry[0].maxlen != threshold:
+            # New key, or the guild changed its threshold; keep the most recent times that fit
+            times = deque(entry[0] if entry else (), maxlen=threshold)
+            if entry is None:
+                self._schedule(key, now + timeframe)
+        else:
+            times = entry[0]
+        self._windows[key] = (times, timeframe)
+
+        times.append(now)
+        if len(times) == threshold and now - times[0] <= timeframe:
+            # Start over so one burst is reported once
+            times.clear()
+            return True
+        return False
+
+    def reset(self, guild_id, user_id):
+        """Forget a user's recent messages in a guild"""
+        entry = self._windows.get((guild_id, user_id))
+        if entry is not None:
+            entry[0].clear()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def _schedule(self, key, at):
+        # Keys due beyond one rotation are filed a rotation ahead and re-checked then
+        ticks = min(max(1, int((at - self._current_tick * self.tick) // self.tick) + 1), len(self._slots) - 1)
+        self._slots[(self._current_tick + ticks) % len(self._slots)].append(key)
+
+    def _advance(self, now):
+        now_tick = int(now // self.tick)
+        if self._current_tick is None:
+            self._current_tick = now_tick
+            return
+
+        # After a long idle spell every slot is due, so one pass over the wheel suffices
+        steps = min(now_tick - self._current_tick, len(self._slots))
+        for _ in range(steps):
+            self._current_tick += 1
+            slot_index = self._current_tick % len(self._slots)
+            due, self._slots[slot_index] = self._slots[slot_index], []
+            for key in due:
+                entry = self._windows.get(key)
+                if entry is None:
+                    continue
+                times, timeframe = entry
+                last = times[-1] if times else None
+                if last is None or now - last > timeframe:
+                    del self._windows[key]
+                else:
+                    self._schedule(key, last + timeframe)
+        self._current_tick = now_tick
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from collections import Counter
+
+logger = logging.getLogger("modubot")
+
+class UsageCounter:
+    """Counts custom command uses in memory and periodically writes them as one batch.
+
+    Increments are applied server-side as `uses = uses + n`, so counts from several
+    processes add up instead of overwriting each other. If a flush fails the counts
+    are merged back and retried on the next flush rather than being lost.
+    """
+
+    def __init__(self, db, flush_interval=30.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._counts = Counter()  # Format: {command_id: pending_uses}
+        self._flush_lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def increment(self, command_id, amount=1):
+        """Record uses of a command without touching the database"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+        self._counts[command_id] += amount
+
+    def pending(self, command_id):
+        """Get the number of uses not yet written to the database"""
+        return self._counts.get(command_id, 0)
+
+    async def flush(self):
+        """Write all pending counts to the database"""
+        async with self._flush_lock:
+            if not self._counts:
+                return
+
+            counts, self._counts = self._counts, Counter()
+            try:
+                await self.db.apply_command_uses(counts)
+            except Exception as e:
+                logger.error(f"Error writing uses for {len(counts)} custom commands: {str(e)}")
+                self._counts.update(counts)
+
+    async def close(self):
+        """Stop the background flush and write the remaining counts"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()